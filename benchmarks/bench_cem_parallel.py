@@ -0,0 +1,34 @@
+"""Speed-up of the process-pool CEM over the single-process engine
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cem_parallel --rows 10000000 --workers 4
+"""
+
+import argparse
+
+from engines.cem import generate_synthetic_users
+from engines.cem_parallel import compare_with_single_process
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    frame = generate_synthetic_users(args.rows, seed=args.seed)
+    result = compare_with_single_process(frame, n_workers=args.workers)
+
+    print(f"rows:             {result['n_rows']:,}")
+    print(f"workers:          {result['n_workers']}")
+    print(f"single process:   {result['single_seconds']:.3f}s")
+    print(f"pool start-up:    {result['spawn_seconds']:.3f}s (not in the speed-up)")
+    print(f"process pool:     {result['parallel_seconds']:.3f}s")
+    print(f"speed-up:         {result['speedup']:.2f}x")
+    print(f"identical result: {result['same_result']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Per-call build time of the lesson figures with and without cached templates
+
+"Rebuilt" builds each figure's static scaffolding from scratch on every
+call, as the pages did before; "template" reuses the cached scaffolding.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_figure_templates --calls 200
+"""
+
+import argparse
+import time
+
+from pages.difference_in_differences import (
+    generate_territory_data,
+    load_retention_templates,
+)
+from pages.selection_bias import CITY_LOCATIONS, load_city_map_template
+from pages.what_is_causality import load_target_template, lookup_shots
+
+
+def measure(build, calls, repeat):
+    """Best mean seconds per call over repeat rounds of calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            build()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def cases():
+    """(label, cached template, uncached template builder, per-call figure)
+
+    The uncached builders are the functions behind the st.cache_resource
+    loaders.
+    """
+    morning, afternoon, _, _ = lookup_shots("hangover", 6)
+    years, retention_a, retention_b = generate_territory_data()
+    gym = CITY_LOCATIONS["gym"]
+
+    return [
+        (
+            "Target plot (what_is_causality)",
+            load_target_template,
+            load_target_template.__wrapped__,
+            lambda template: template.figure(
+                traces=[
+                    ("morning", dict(x=morning[0], y=morning[1])),
+                    ("afternoon", dict(x=afternoon[0], y=afternoon[1])),
+                ]
+            ),
+        ),
+        (
+            "City map (selection_bias)",
+            load_city_map_template,
+            load_city_map_template.__wrapped__,
+            lambda template: template.figure(
+                traces=[("pin", dict(x=[gym["x"]], y=[gym["y"] + 0.5]))]
+            ),
+        ),
+        (
+            "Retention plot (difference_in_differences)",
+            lambda: load_retention_templates()["after"],
+            lambda: load_retention_templates.__wrapped__()["after"],
+            lambda template: template.figure(
+                traces=[
+                    ("treatment", dict(x=years, y=retention_a)),
+                    ("control", dict(x=years, y=retention_b)),
+                ],
+                annotations=[dict(x=3, y=87, text="DiD", showarrow=False)],
+                title="Difference-in-Differences Calculation",
+            ),
+        ),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for label, load, rebuild, build in cases():
+        template = load()
+
+        before = measure(lambda: build(rebuild()), args.calls, args.repeat)
+        after = measure(lambda: build(template), args.calls, args.repeat)
+        print(label)
+        print(f"  rebuilt:  {before * 1e3:>8.3f} ms per call")
+        print(f"  template: {after * 1e3:>8.3f} ms per call")
+        print(f"  ratio:    {before / after:>8.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
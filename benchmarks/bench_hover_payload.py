@@ -0,0 +1,118 @@
+"""Figure size and build time with per-point hover strings vs a hovertemplate
+
+Run from the repository root:
+
+    python -m benchmarks.bench_hover_payload --students 100000
+"""
+
+import argparse
+import time
+
+import plotly.graph_objects as go
+
+from pages.confounders import (
+    create_instrumental_comparison_plot,
+    create_scatter_plot,
+    generate_classroom_data,
+    generate_treated_data,
+)
+
+
+def legacy_scatter_plot(data):
+    """The classroom scatter as it was built before: one hover string per point"""
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scattergl(
+            x=data["classroom_hours"],
+            y=data["grades"],
+            mode="markers",
+            marker=dict(
+                color=data["motivation"],
+                colorscale="RdYlBu_r",
+                size=6,
+                opacity=0.7,
+                colorbar=dict(title="Motivation Level"),
+            ),
+            name="Students",
+            text=[
+                f"Hours: {h:.1f}<br>Grade: {g:.1f}<br>Motivation: {m:.1f}"
+                for h, g, m in zip(
+                    data["classroom_hours"], data["grades"], data["motivation"]
+                )
+            ],
+            hovertemplate="%{text}<extra></extra>",
+        )
+    )
+    return fig
+
+
+def legacy_comparison_plot(original_data, treated_data):
+    """The comparison scatter as it was built before, without trend lines"""
+    fig = go.Figure()
+    for data, color in [(original_data, "red"), (treated_data, "blue")]:
+        fig.add_trace(
+            go.Scattergl(
+                x=data["classroom_hours"],
+                y=data["grades"],
+                mode="markers",
+                marker=dict(color=color, size=6, opacity=0.6),
+                text=[
+                    f"Hours: {h:.1f}<br>Grade: {g:.1f}"
+                    for h, g in zip(data["classroom_hours"], data["grades"])
+                ],
+                hovertemplate="%{text}<extra></extra>",
+            )
+        )
+    return fig
+
+
+def measure(build, repeat):
+    """Best build time and serialized JSON size of a figure"""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = build()
+        payload = fig.to_json()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds), len(payload)
+
+
+def report(label, before, after):
+    (before_s, before_bytes), (after_s, after_bytes) = before, after
+    print(f"{label}")
+    print(f"  before: {before_bytes:>12,} bytes {before_s:>8.3f}s")
+    print(f"  after:  {after_bytes:>12,} bytes {after_s:>8.3f}s")
+    print(
+        f"  ratio:  {before_bytes / after_bytes:>12.1f}x "
+        f"{before_s / after_s:>8.1f}x faster"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    original = generate_classroom_data(args.students)
+    treated = generate_treated_data(args.students)
+
+    report(
+        f"Classroom scatter, {args.students:,} students",
+        measure(lambda: legacy_scatter_plot(original), args.repeat),
+        measure(
+            lambda: create_scatter_plot(original, show_confounders=True), args.repeat
+        ),
+    )
+    report(
+        f"Comparison scatter, {args.students:,} students per group",
+        measure(lambda: legacy_comparison_plot(original, treated), args.repeat),
+        measure(
+            lambda: create_instrumental_comparison_plot(original, treated),
+            args.repeat,
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Time and peak memory of each matching stage from 1e3 to 1e7 users
+
+Run from the repository root:
+
+    python -m benchmarks.bench_matching_pipeline --output matching.json
+
+Each stage is timed (best of --repeat) with memory tracing off, then run
+once more under tracemalloc for its peak allocation. Results are written
+as JSON so runs from different versions can be diffed.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from engines.cem import (
+    DEFAULT_EDGES,
+    coarsen,
+    generate_synthetic_users,
+    matched_pair_effect,
+    naive_effect_from_counts,
+    pack_strata,
+    strata_shape,
+    stratum_counts,
+)
+from engines.cem_index import StratumIndex
+from engines.user_store import USER_DTYPE
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def frame_to_store(frame):
+    """Structured user records, as the lesson keeps them, from a synthetic frame"""
+    treated = frame["treated"].to_numpy()
+    store = np.empty(len(frame), dtype=USER_DTYPE)
+    store["id"] = np.char.add(np.where(treated, "P", "F"), frame["id"].astype(str))
+    store["type"] = np.where(treated, "premium", "free")
+    store["age"] = frame["age"]
+    store["income"] = frame["income"]
+    store["churned"] = frame["churned"]
+    return store
+
+
+def lookup_stage(store, n_lookups, seed):
+    """Compare random premium/free pairs against a stratum index
+
+    The index and the pairs are built up front, as the lesson builds its
+    index once per process, so only the lookups are timed.
+    """
+    index = StratumIndex(store)
+    rng = np.random.default_rng(seed)
+    premium = store["id"][store["type"] == "premium"]
+    free = store["id"][store["type"] == "free"]
+    pairs = list(zip(rng.choice(premium, n_lookups), rng.choice(free, n_lookups)))
+
+    def run():
+        for p_id, f_id in pairs:
+            index.compare(p_id, f_id)
+
+    return run
+
+
+def stratum_pairs(keys, treated):
+    """1:1 (premium, free) row pairs within each stratum, as the game saves them
+
+    The i-th premium user of a stratum is paired with its i-th free user;
+    premium users beyond the stratum's free users stay unmatched.
+    """
+    treated = np.asarray(treated, dtype=bool)
+    premium = np.flatnonzero(treated)
+    free = np.flatnonzero(~treated)
+    premium = premium[np.argsort(keys[premium], kind="stable")]
+    free = free[np.argsort(keys[free], kind="stable")]
+
+    premium_keys = keys[premium]
+    free_keys = keys[free]
+    rank = np.arange(len(premium)) - np.searchsorted(premium_keys, premium_keys)
+    first_free = np.searchsorted(free_keys, premium_keys, side="left")
+    n_free = np.searchsorted(free_keys, premium_keys, side="right") - first_free
+
+    paired = rank < n_free
+    return premium[paired], free[first_free[paired] + rank[paired]]
+
+
+def measure(stage, repeat):
+    """Best wall time over `repeat` runs, then peak traced bytes of one run"""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    stage()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(seconds), peak
+
+
+def bench_size(n_users, args):
+    """Records for every stage at one population size"""
+    frame = generate_synthetic_users(n_users, seed=args.seed)
+    shape = strata_shape(DEFAULT_EDGES)
+    codes = coarsen(frame, DEFAULT_EDGES)
+    keys = pack_strata(codes, shape)
+
+    premium_rows, free_rows = stratum_pairs(keys, frame["treated"])
+    churned = frame["churned"].to_numpy()
+
+    # The Python index is dict-based, so it gets a capped sample of users
+    n_indexed = min(n_users, args.index_users)
+    store = frame_to_store(frame.iloc[:n_indexed])
+
+    stages = {
+        "generate": lambda: generate_synthetic_users(n_users, seed=args.seed),
+        "bucket": lambda: coarsen(frame, DEFAULT_EDGES),
+        "stratify": lambda: pack_strata(codes, shape),
+        "naive_effect": lambda: naive_effect_from_counts(
+            stratum_counts(
+                keys, frame["treated"], frame["churned"], int(np.prod(shape))
+            )
+        ),
+        "matched_effect": lambda: matched_pair_effect(churned, premium_rows, free_rows),
+        "match_lookup": lookup_stage(store, args.lookups, args.seed),
+    }
+
+    records = []
+    for name, stage in stages.items():
+        seconds, peak = measure(stage, args.repeat)
+        records.append(
+            {
+                "n_users": n_users,
+                "stage": name,
+                "seconds": seconds,
+                "peak_bytes": peak,
+                "n_items": n_indexed if name == "match_lookup" else n_users,
+            }
+        )
+        print(f"{n_users:>12,} {name:<15} {seconds:>10.4f}s {peak / 2**20:>10.1f} MiB")
+    return records
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lookups", type=int, default=1_000)
+    parser.add_argument("--index-users", type=int, default=100_000)
+    parser.add_argument("--output", default="bench_matching_pipeline.json")
+    args = parser.parse_args()
+
+    records = []
+    for n_users in args.sizes:
+        records.extend(bench_size(n_users, args))
+
+    result = {
+        "benchmark": "matching_pipeline",
+        "created": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "settings": vars(args),
+        "records": records,
+    }
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"wrote {len(records)} records to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
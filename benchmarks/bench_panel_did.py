@@ -0,0 +1,81 @@
+"""Time the panel DiD engine on a synthetic units × periods panel
+
+--drop removes that share of rows at random, making the panel unbalanced
+so the fixed effects take several alternating-projection sweeps.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_panel_did --units 100000 --periods 100 --drop 0.2
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from engines.event_study import EventStudy
+from engines.panel_did import Panel, simulate_panel
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"  {label:<18} {time.perf_counter() - start:>8.3f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--units", type=int, default=100_000)
+    parser.add_argument("--periods", type=int, default=100)
+    parser.add_argument("--effect", type=float, default=5.0)
+    parser.add_argument("--drop", type=float, default=0.0)
+    parser.add_argument(
+        "--staggered",
+        action="store_true",
+        help="adopt in four waves with a growing effect, and time the event study",
+    )
+    args = parser.parse_args()
+
+    print(f"{args.units:,} units × {args.periods} periods")
+    frame = timed(
+        "simulate",
+        lambda: simulate_panel(
+            args.units,
+            args.periods,
+            adoption_periods=(
+                tuple([None] + [args.periods * k // 5 for k in range(1, 5)])
+                if args.staggered
+                else (None, args.periods // 2)
+            ),
+            effect=args.effect,
+            effect_growth=0.1 if args.staggered else 0.0,
+        ),
+    )
+    if args.drop:
+        keep = np.random.default_rng(1).random(len(frame)) >= args.drop
+        frame = frame[keep].reset_index(drop=True)
+        print(f"  {len(frame):,} rows after dropping {args.drop:.0%}")
+
+    panel = timed("encode", lambda: Panel(frame))
+    timed("group-time means", panel.group_time_means)
+    did = timed("2×2 DiD", panel.did_2x2)
+    fit = timed("TWFE, clustered", lambda: panel.twfe_fit(frame["territory"]))
+    if args.staggered:
+        study = timed("event study cells", lambda: EventStudy(panel))
+        timed("cohort-time ATTs", study.cohort_time_effects)
+        windows = [(-k, k) for k in range(1, args.periods // 5)]
+        timed(
+            f"{len(windows)} windows",
+            lambda: [study.event_time_effects(window) for window in windows],
+        )
+        print(f"  event study average {study.overall_att():.4f}")
+    print(
+        f"  effect at adoption {args.effect:g}, 2×2 {did['did']:.4f}, "
+        f"TWFE {fit['coef']:.4f} (SE {fit['std_err']:.4f}, "
+        f"{fit['n_clusters']} territories, {fit['iterations']} sweeps)"
+    )
+
+
+if __name__ == "__main__":
+    main()
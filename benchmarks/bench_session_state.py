@@ -0,0 +1,98 @@
+"""Bytes of CEM lesson state held per session, before and after the store
+
+Also reports the size of the matching game's user grid payload, which the
+browser receives once per render for the whole population.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_session_state --users 5000
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from components.user_grid import grid_payload
+from engines.cem import generate_synthetic_users
+from engines.cem_index import StratumIndex
+from engines.user_store import MatchState, build_user_store, deep_sizeof
+from pages.coarsened_exact_matching import generate_user_data, get_matching_subset
+
+
+def synthetic_user_dicts(n_users, seed=0):
+    """Synthetic users in the lesson's list-of-dicts shape"""
+    frame = generate_synthetic_users(n_users, seed=seed)
+    return [
+        {
+            "id": f"{'P' if treated else 'F'}{i + 1}",
+            "type": "premium" if treated else "free",
+            "age": int(age),
+            "income": int(income),
+            "churned": bool(churned),
+            "color": "red" if treated else "blue",
+        }
+        for i, (treated, age, income, churned) in enumerate(
+            zip(frame["treated"], frame["age"], frame["income"], frame["churned"])
+        )
+    ]
+
+
+def legacy_session(all_users, matching_users, n_pairs):
+    """Session state as kept before: user dict lists and full match results
+
+    The index only builds the match results, in the old find_matches shape;
+    the old session never held one.
+    """
+    index = StratumIndex(matching_users)
+    premium = [u["id"] for u in matching_users if u["type"] == "premium"]
+    free = [u["id"] for u in matching_users if u["type"] == "free"]
+    matches_found = [index.compare(p, f) for p, f in zip(premium, free)][:n_pairs]
+
+    return {
+        "all_users": all_users,
+        "matching_users": matching_users,
+        "matches_found": matches_found,
+    }
+
+
+def compact_session(matching_store, n_pairs):
+    """Session state as kept now: a selection bitmap and row pairs"""
+    matches = MatchState()
+    premium = np.flatnonzero(matching_store["type"] == "premium").tolist()
+    free = np.flatnonzero(matching_store["type"] == "free").tolist()
+    for premium_row, free_row in list(zip(premium, free))[:n_pairs]:
+        matches.save_pair(premium_row, free_row)
+    matches.selected = (1 << premium[-1]) | (1 << free[-1])
+    return {"cem_matches": matches}
+
+
+def measure(label, all_users, matching_users, n_pairs):
+    legacy = deep_sizeof(legacy_session(all_users, matching_users, n_pairs))
+    compact = deep_sizeof(compact_session(build_user_store(matching_users), n_pairs))
+    shared = deep_sizeof(build_user_store(all_users)) + deep_sizeof(
+        build_user_store(matching_users)
+    )
+    grid = len(json.dumps(grid_payload(build_user_store(matching_users))))
+
+    print(f"{label}")
+    print(f"  before: {legacy:>12,} bytes per session")
+    print(f"  after:  {compact:>12,} bytes per session")
+    print(f"  shared: {shared:>12,} bytes once per process")
+    print(f"  grid:   {grid:>12,} bytes of grid payload per render")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--pairs", type=int, default=5)
+    args = parser.parse_args()
+
+    measure("Lesson data", generate_user_data(), get_matching_subset(), args.pairs)
+
+    users = synthetic_user_dicts(args.users)
+    measure(f"{args.users:,} synthetic users", users, users, args.pairs)
+
+
+if __name__ == "__main__":
+    main()
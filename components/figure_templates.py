@@ -0,0 +1,39 @@
+import plotly.graph_objects as go
+
+
+class FigureTemplate:
+    """Static figure scaffolding that is validated once and reused per call
+
+    The scaffolding (layout, shapes, annotations and any fixed traces) and
+    the style of each data trace are built as ordinary Plotly objects once
+    and kept as plain dicts. figure() then assembles a new Figure from those
+    dicts plus the per-call data without re-running Plotly's validation,
+    which is most of the cost of building a small figure.
+    """
+
+    def __init__(self, scaffold, traces=None):
+        spec = scaffold.to_plotly_json()
+        self.layout = spec["layout"]
+        self.data = spec["data"]
+        self.traces = {
+            name: trace.to_plotly_json() for name, trace in (traces or {}).items()
+        }
+
+    def figure(self, traces=(), annotations=(), **layout):
+        """Fresh figure of the scaffolding plus (style name, data) traces
+
+        annotations are appended to the scaffolding's own; other keyword
+        arguments override top-level layout properties such as title. These
+        small per-call pieces are still validated, the scaffolding is not.
+        """
+        data = self.data + [
+            dict(self.traces[name], **values) for name, values in traces
+        ]
+        overrides = go.Layout(**layout).to_plotly_json() if layout else {}
+        layout = dict(self.layout, **overrides)
+        if annotations:
+            layout["annotations"] = self.layout.get("annotations", []) + [
+                go.layout.Annotation(annotation).to_plotly_json()
+                for annotation in annotations
+            ]
+        return go.Figure(data=data, layout=layout, _validate=False)
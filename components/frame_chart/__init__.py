@@ -0,0 +1,51 @@
+import json
+import shutil
+from importlib import resources
+from pathlib import Path
+
+import streamlit.components.v1 as components
+from plotly.offline import get_plotlyjs_version
+
+_FRONTEND = Path(__file__).parent / "frontend"
+
+_frame_chart = components.declare_component("frame_chart", path=str(_FRONTEND))
+
+
+def bundle_plotlyjs():
+    """File name of the plotly.js copy served next to the frontend, or None
+
+    The copy comes from the installed plotly package, so the chart needs no
+    CDN and always matches the figures that package builds. It is made once
+    per plotly version; None means the frontend directory is not writable.
+    """
+    name = f"plotly-{get_plotlyjs_version()}.min.js"
+    target = _FRONTEND / name
+    if not target.exists():
+        source = resources.files("plotly") / "package_data" / "plotly.min.js"
+        try:
+            with resources.as_file(source) as path:
+                shutil.copyfile(path, target)
+        except OSError:
+            return None
+    return name
+
+
+def frame_chart(fig, height=None, key=None, on_change=None):
+    """Render a figure with client-side frames and report where its slider lands
+
+    Scrubbing the figure's own slider swaps frames in the browser without a
+    rerun; only letting go of it sends the chosen step back to Python.
+    Returns {"value": step value, "nonce": ...} for the last step chosen in
+    the browser, or None before the first one.
+    """
+    spec = json.loads(fig.to_json())
+    return _frame_chart(
+        data=spec["data"],
+        layout=spec["layout"],
+        frames=spec.get("frames", []),
+        plotly_src=bundle_plotlyjs(),
+        height=height or spec["layout"].get("height", 450),
+        key=key,
+        on_change=on_change,
+        default=None,
+    )
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import streamlit.components.v1 as components
+
+from engines.cem import BUCKET_LABELS, DEFAULT_EDGES, coarsen
+
+_user_grid = components.declare_component(
+    "user_grid", path=str(Path(__file__).parent / "frontend")
+)
+
+
+def grid_payload(store, edges=DEFAULT_EDGES):
+    """Static columnar payload for a user store, built once and reused"""
+    codes = coarsen({"age": store["age"], "income": store["income"]}, edges)
+    return {
+        "ids": store["id"].tolist(),
+        "treated": (store["type"] == "premium").tolist(),
+        "age": store["age"].tolist(),
+        "income": store["income"].tolist(),
+        "churned": store["churned"].tolist(),
+        "age_bucket": codes[:, 0].tolist(),
+        "income_bucket": codes[:, 1].tolist(),
+        "age_labels": list(BUCKET_LABELS["age"]),
+        "income_labels": list(BUCKET_LABELS["income"]),
+    }
+
+
+def user_grid(
+    payload,
+    matched_rows=(),
+    selected_premium=None,
+    selected_free=None,
+    show_buckets=False,
+    selectable=True,
+    height=480,
+    key=None,
+):
+    """Render every user as one virtualised grid with client-side selection
+
+    Returns the last pair picked in the browser as
+    {"premium": id, "free": id, "nonce": ...}, or None before the first pick.
+    With selectable=False the grid only lists the users and never returns one.
+    """
+    return _user_grid(
+        **payload,
+        matched_rows=list(matched_rows),
+        selected_premium=selected_premium,
+        selected_free=selected_free,
+        show_buckets=show_buckets,
+        selectable=selectable,
+        height=height,
+        key=key,
+        default=None,
+    )
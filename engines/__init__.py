@@ -0,0 +1 @@
+# Engines module
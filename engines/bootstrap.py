@@ -0,0 +1,87 @@
+import numpy as np
+
+DEFAULT_N_BOOT = 10_000
+
+
+def resample_weights(cell_counts, n_boot=DEFAULT_N_BOOT, seed=0, method="multinomial"):
+    """(n_boot, n_cells) bootstrap weights for cells of identical units
+
+    Units that share an outcome row are interchangeable, so the weight a
+    resample puts on a cell is the sum of its units' weights. That sum is
+    drawn directly: jointly multinomial for the classic bootstrap, or an
+    independent Poisson per cell for the Poisson bootstrap. The matrix is
+    then B x cells instead of B x units.
+    """
+    cell_counts = np.asarray(cell_counts, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    if method == "poisson":
+        return rng.poisson(cell_counts, size=(n_boot, len(cell_counts)))
+    if method == "multinomial":
+        total = cell_counts.sum()
+        return rng.multinomial(total, cell_counts / total, size=n_boot)
+    raise ValueError(f"unknown bootstrap method: {method!r}")
+
+
+def percentile_interval(replicates, level=0.95):
+    """Percentile interval, ignoring resamples where the statistic is undefined"""
+    tail = (1 - level) / 2 * 100
+    low, high = np.nanpercentile(replicates, [tail, 100 - tail])
+    return float(low), float(high)
+
+
+def bootstrap_naive_effect(
+    counts, n_boot=DEFAULT_N_BOOT, level=0.95, seed=0, method="multinomial"
+):
+    """Interval for control churn minus treated churn from stratum counts
+
+    Users collapse into four cells: (control, treated) x (stayed, churned).
+    """
+    n_control = counts["n_control"].sum()
+    n_treated = counts["n_treated"].sum()
+    churn_control = counts["churn_control"].sum()
+    churn_treated = counts["churn_treated"].sum()
+    cells = [
+        n_control - churn_control,
+        churn_control,
+        n_treated - churn_treated,
+        churn_treated,
+    ]
+
+    # Columns: control users, control churners, treated users, treated churners
+    design = np.array(
+        [
+            [1, 0, 0, 0],
+            [1, 1, 0, 0],
+            [0, 0, 1, 0],
+            [0, 0, 1, 1],
+        ]
+    )
+    totals = resample_weights(cells, n_boot, seed, method) @ design
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        effects = totals[:, 1] / totals[:, 0] - totals[:, 3] / totals[:, 2]
+    return percentile_interval(effects, level)
+
+
+def bootstrap_matched_effect(
+    churned,
+    premium_idx,
+    free_idx,
+    n_boot=DEFAULT_N_BOOT,
+    level=0.95,
+    seed=0,
+    method="multinomial",
+):
+    """Interval for the matched-pair effect, resampling whole pairs
+
+    Each pair's free minus premium churn is -1, 0 or 1, so pairs collapse
+    into three cells.
+    """
+    churned = np.asarray(churned, dtype=np.int64)
+    differences = churned[np.asarray(free_idx)] - churned[np.asarray(premium_idx)]
+    cells = np.bincount(differences + 1, minlength=3)
+
+    weights = resample_weights(cells, n_boot, seed, method)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        effects = (weights @ np.array([-1, 0, 1])) / weights.sum(axis=1)
+    return percentile_interval(effects, level)
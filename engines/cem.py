@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+
+
+# Coarsening used by the CEM lesson: bucket edges and labels per covariate
+COVARIATES = ("age", "income")
+DEFAULT_EDGES = {
+    "age": (30, 50),  # Young (<30), Middle-aged (30-49), Older (50+)
+    "income": (40000, 80000),  # Low (<£40k), Medium (£40k-80k), High (£80k+)
+}
+BUCKET_LABELS = {
+    "age": ("Young", "Middle-aged", "Older"),
+    "income": ("Low", "Medium", "High"),
+}
+
+
+def generate_synthetic_users(n_users, seed=0, premium_share=0.4):
+    """Synthetic churn table with the confounding structure of the lesson
+
+    Premium users skew older and wealthier, and older, wealthier users churn
+    less regardless of plan, as in generate_user_data.
+    """
+    rng = np.random.default_rng(seed)
+    treated = rng.random(n_users) < premium_share
+
+    age = np.where(treated, rng.normal(42, 9, n_users), rng.normal(35, 9, n_users))
+    age = np.clip(np.round(age), 18, 75)
+    income = np.where(
+        treated, rng.normal(72000, 18000, n_users), rng.normal(55000, 18000, n_users)
+    )
+    income = np.clip(np.round(income, -3), 15000, 200000)
+
+    # Churn falls with age and income; premium itself only helps a little
+    churn_prob = 0.95 - 0.012 * (age - 18) - 0.000004 * (income - 15000)
+    churn_prob = np.clip(churn_prob - 0.1 * treated, 0.02, 0.98)
+    churned = rng.random(n_users) < churn_prob
+
+    return pd.DataFrame(
+        {
+            "id": np.arange(n_users, dtype=np.int64),
+            "treated": treated,
+            "age": age,
+            "income": income,
+            "churned": churned,
+        }
+    )
+
+
+def coarsen(frame, edges=DEFAULT_EDGES):
+    """Bucket every covariate with one vectorised np.digitize pass each"""
+    columns = [np.asarray(frame[name]) for name in edges]
+    codes = np.empty((len(columns[0]), len(edges)), dtype=np.int64)
+    for j, (column, cuts) in enumerate(zip(columns, edges.values())):
+        # right=False matches the `age < 30` style comparisons in the lesson
+        codes[:, j] = np.digitize(column, np.asarray(cuts))
+    return codes
+
+
+def strata_shape(edges=DEFAULT_EDGES):
+    """Number of buckets per covariate (one more than the number of edges)"""
+    return tuple(len(cuts) + 1 for cuts in edges.values())
+
+
+def pack_strata(codes, shape):
+    """Pack per-covariate bucket codes into one integer key per row"""
+    return np.ravel_multi_index(codes.T, shape).astype(np.int64)
+
+
+def unpack_strata(keys, shape):
+    """Recover per-covariate bucket codes from packed stratum keys"""
+    return np.stack(np.unravel_index(np.asarray(keys), shape), axis=1)
+
+
+def stratify(frame, edges=DEFAULT_EDGES):
+    """Coarsen a frame and return its packed stratum keys"""
+    return pack_strata(coarsen(frame, edges), strata_shape(edges))
+
+
+def stratum_counts(keys, treated, churned, n_strata):
+    """Per-stratum sufficient statistics as dense arrays indexed by key
+
+    The result is additive: counts from disjoint row sets can be merged with
+    merge_counts, which is what the streaming and parallel paths rely on.
+    """
+    treated = np.asarray(treated, dtype=bool)
+    churned = np.asarray(churned, dtype=np.float64)
+
+    # Offset treated rows by n_strata so one bincount covers both arms
+    arm_keys = keys + treated * n_strata
+    counts = np.bincount(arm_keys, minlength=2 * n_strata)
+    churn = np.bincount(arm_keys, weights=churned, minlength=2 * n_strata)
+
+    return {
+        "n_control": counts[:n_strata].astype(np.float64),
+        "n_treated": counts[n_strata:].astype(np.float64),
+        "churn_control": churn[:n_strata],
+        "churn_treated": churn[n_strata:],
+    }
+
+
+def merge_counts(a, b):
+    """Add two sets of per-stratum sufficient statistics"""
+    return {name: a[name] + b[name] for name in a}
+
+
+def summarize_strata(counts, edges=DEFAULT_EDGES):
+    """Per-stratum table of counts, churn rates and matched status"""
+    n_treated = counts["n_treated"]
+    n_control = counts["n_control"]
+    occupied = np.flatnonzero(n_treated + n_control)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        treated_rate = counts["churn_treated"] / n_treated
+        control_rate = counts["churn_control"] / n_control
+
+    table = pd.DataFrame(
+        {
+            "stratum": occupied,
+            "n_treated": n_treated[occupied].astype(np.int64),
+            "n_control": n_control[occupied].astype(np.int64),
+            "treated_churn_rate": treated_rate[occupied],
+            "control_churn_rate": control_rate[occupied],
+            "matched": (n_treated[occupied] > 0) & (n_control[occupied] > 0),
+        }
+    )
+
+    # Human-readable bucket labels for each covariate
+    codes = unpack_strata(occupied, strata_shape(edges))
+    for j, name in enumerate(edges):
+        labels = BUCKET_LABELS.get(name)
+        if labels is not None and len(labels) == len(edges[name]) + 1:
+            table[f"{name}_bucket"] = np.asarray(labels)[codes[:, j]]
+        else:
+            table[f"{name}_bucket"] = codes[:, j]
+
+    return table
+
+
+def naive_effect_from_counts(counts):
+    """Control churn rate minus treated churn rate, ignoring strata"""
+    treated_rate = counts["churn_treated"].sum() / counts["n_treated"].sum()
+    control_rate = counts["churn_control"].sum() / counts["n_control"].sum()
+    return control_rate - treated_rate
+
+
+def cem_att_from_counts(counts):
+    """CEM-weighted ATT: stratum effects weighted by matched treated counts"""
+    n_treated = counts["n_treated"]
+    n_control = counts["n_control"]
+    matched = (n_treated > 0) & (n_control > 0)
+    if not matched.any():
+        return float("nan")
+
+    treated_rate = counts["churn_treated"][matched] / n_treated[matched]
+    control_rate = counts["churn_control"][matched] / n_control[matched]
+    weights = n_treated[matched] / n_treated[matched].sum()
+
+    # Same sign convention as the lesson: free churn minus premium churn
+    return float(np.dot(weights, control_rate - treated_rate))
+
+
+def cem_weights(keys, treated, counts):
+    """Per-row CEM weights (1 for matched treated, rescaled for controls)"""
+    treated = np.asarray(treated, dtype=bool)
+    n_treated = counts["n_treated"]
+    n_control = counts["n_control"]
+    matched = (n_treated > 0) & (n_control > 0)
+
+    m_treated = n_treated[matched].sum()
+    m_control = n_control[matched].sum()
+
+    control_weight = np.zeros_like(n_control)
+    if m_treated > 0:
+        control_weight[matched] = (
+            (m_control / m_treated) * n_treated[matched] / n_control[matched]
+        )
+
+    row_matched = matched[keys]
+    return np.where(treated, row_matched.astype(np.float64), control_weight[keys])
+
+
+def matched_pair_effect(churned, premium_idx, free_idx):
+    """Effect from explicit 1:1 pairs, as computed by the matching game"""
+    churned = np.asarray(churned, dtype=np.float64)
+    premium_churn = churned[np.asarray(premium_idx)].mean()
+    free_churn = churned[np.asarray(free_idx)].mean()
+    return free_churn - premium_churn
+
+
+def run_cem(frame, edges=DEFAULT_EDGES):
+    """Columnar CEM over a frame: naive effect, CEM ATT and strata table"""
+    shape = strata_shape(edges)
+    keys = stratify(frame, edges)
+    counts = stratum_counts(
+        keys, frame["treated"], frame["churned"], int(np.prod(shape))
+    )
+
+    return {
+        "naive_effect": naive_effect_from_counts(counts),
+        "cem_att": cem_att_from_counts(counts),
+        "strata": summarize_strata(counts, edges),
+        "counts": counts,
+        "keys": keys,
+    }
@@ -0,0 +1,98 @@
+from bisect import bisect_right
+
+import numpy as np
+
+from engines.cem import BUCKET_LABELS, DEFAULT_EDGES, strata_shape
+
+
+class StratumIndex:
+    """Hash index of users keyed by id and by coarsened stratum
+
+    Each user is bucketed once on insert. Lookups by id and the candidate
+    list for a stratum are dict lookups, so the matching game never rescans
+    the user list on a rerun. Matches live in the session's MatchState, so
+    one index can be shared read-only by every session.
+    """
+
+    def __init__(self, users=(), edges=DEFAULT_EDGES):
+        self.edges = edges
+        self.shape = strata_shape(edges)
+        self._users = {}  # id -> user dict
+        self._strata = {}  # id -> packed stratum key
+        self._members = {}  # stratum key -> {type: {id: None}} (ordered sets)
+
+        for user in users:
+            self.insert(user)
+
+    def __len__(self):
+        return len(self._users)
+
+    def __contains__(self, user_id):
+        return user_id in self._users
+
+    def _bucket_codes(self, user):
+        return tuple(
+            bisect_right(cuts, user[name]) for name, cuts in self.edges.items()
+        )
+
+    def insert(self, user):
+        """Add a user, bucketing it once"""
+        user_id = user["id"]
+        if user_id in self._users:
+            self.delete(user_id)
+
+        key = int(np.ravel_multi_index(self._bucket_codes(user), self.shape))
+        self._users[user_id] = user
+        self._strata[user_id] = key
+        self._members.setdefault(key, {"premium": {}, "free": {}})[user["type"]][
+            user_id
+        ] = None
+
+    def delete(self, user_id):
+        """Remove a user"""
+        user = self._users.pop(user_id)
+        key = self._strata.pop(user_id)
+        self._members[key][user["type"]].pop(user_id, None)
+
+    def get(self, user_id):
+        """User dict for an id"""
+        return self._users[user_id]
+
+    def stratum_of(self, user_id):
+        """Packed stratum key for an id"""
+        return self._strata[user_id]
+
+    def buckets(self, user_id):
+        """Bucket labels for an id, one per covariate"""
+        codes = np.unravel_index(self._strata[user_id], self.shape)
+        labels = []
+        for name, code in zip(self.edges, codes):
+            names = BUCKET_LABELS.get(name)
+            if names is not None and len(names) == len(self.edges[name]) + 1:
+                labels.append(names[code])
+            else:
+                labels.append(int(code))
+        return tuple(labels)
+
+    def candidates(self, user_id):
+        """Users of the opposite type in the same stratum"""
+        other = "free" if self._users[user_id]["type"] == "premium" else "premium"
+        return list(self._members[self._strata[user_id]][other])
+
+    def compare(self, premium_id, free_id):
+        """Bucket comparison for a pair, in the shape returned by find_matches"""
+        premium_buckets = self.buckets(premium_id)
+        free_buckets = self.buckets(free_id)
+        age_match = premium_buckets[0] == free_buckets[0]
+        income_match = premium_buckets[1] == free_buckets[1]
+
+        return {
+            "premium_user": self._users[premium_id],
+            "free_user": self._users[free_id],
+            "age_match": age_match,
+            "income_match": income_match,
+            "perfect_match": self._strata[premium_id] == self._strata[free_id],
+            "premium_buckets": premium_buckets,
+            "free_buckets": free_buckets,
+        }
+
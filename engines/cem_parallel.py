@@ -0,0 +1,144 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from engines.cem import (
+    DEFAULT_EDGES,
+    cem_att_from_counts,
+    coarsen,
+    merge_counts,
+    naive_effect_from_counts,
+    pack_strata,
+    run_cem,
+    strata_shape,
+    stratum_counts,
+    summarize_strata,
+)
+
+
+def _count_block(shm_name, shape, start, stop, edges):
+    """Worker: coarsen one row block of the shared columns and count it"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        columns = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        block = columns[:, start:stop]
+
+        # Rows are laid out as covariates..., treated, churned
+        covariates = {name: block[j] for j, name in enumerate(edges)}
+        strata = strata_shape(edges)
+        keys = pack_strata(coarsen(covariates, edges), strata)
+        counts = stratum_counts(keys, block[-2] > 0, block[-1], int(np.prod(strata)))
+        del columns, block, covariates
+        return counts
+    finally:
+        shm.close()
+
+
+def _warm_up(_):
+    """Worker: no-op that starts the process and imports this module in it"""
+    return os.getpid()
+
+
+def start_pool(n_workers=None):
+    """Process pool with every worker started and the engine imported
+
+    Pass it to parallel_cem to keep process start-up out of the CEM run.
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+
+    # Workers must share the parent's resource tracker; one started in a
+    # worker would report the shared block as leaked after we unlink it
+    resource_tracker.ensure_running()
+    pool = ProcessPoolExecutor(max_workers=n_workers)
+    list(pool.map(_warm_up, range(n_workers)))
+    return pool
+
+
+def parallel_cem(frame, edges=DEFAULT_EDGES, n_workers=None, pool=None):
+    """CEM across a process pool with the input columns in shared memory
+
+    Covariates, treatment and churn are copied once into a shared block;
+    workers attach to it by name and each coarsens and counts a contiguous
+    row range. Their per-stratum counts are additive and get summed into
+    the final naive effect and CEM ATT. n_workers sets the number of row
+    blocks; without a pool, one with that many processes is started and
+    shut down around the run.
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    if pool is None:
+        with start_pool(n_workers) as pool:
+            return parallel_cem(frame, edges, n_workers, pool)
+
+    n_rows = len(frame)
+    shape = (len(edges) + 2, n_rows)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+    try:
+        columns = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        for j, name in enumerate(edges):
+            columns[j] = frame[name]
+        columns[-2] = frame["treated"]
+        columns[-1] = frame["churned"]
+        del columns
+
+        # Contiguous row blocks keep the work balanced however skewed the
+        # strata are, and the additive counts make the merge order-free
+        bounds = np.linspace(0, n_rows, n_workers + 1).astype(np.int64)
+        partials = pool.map(
+            _count_block,
+            [shm.name] * n_workers,
+            [shape] * n_workers,
+            bounds[:-1],
+            bounds[1:],
+            [edges] * n_workers,
+        )
+        counts = None
+        for partial in partials:
+            counts = partial if counts is None else merge_counts(counts, partial)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return {
+        "naive_effect": naive_effect_from_counts(counts),
+        "cem_att": cem_att_from_counts(counts),
+        "strata": summarize_strata(counts, edges),
+        "counts": counts,
+        "n_workers": n_workers,
+    }
+
+
+def compare_with_single_process(frame, edges=DEFAULT_EDGES, n_workers=None):
+    """Time run_cem against parallel_cem on the same input
+
+    The pool is started before the parallel run is timed; its start-up is
+    reported separately as spawn_seconds.
+    """
+    start = time.perf_counter()
+    single = run_cem(frame, edges)
+    single_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pool = start_pool(n_workers)
+    spawn_seconds = time.perf_counter() - start
+
+    with pool:
+        start = time.perf_counter()
+        parallel = parallel_cem(frame, edges, n_workers, pool)
+        parallel_seconds = time.perf_counter() - start
+
+    return {
+        "n_rows": len(frame),
+        "n_workers": parallel["n_workers"],
+        "single_seconds": single_seconds,
+        "spawn_seconds": spawn_seconds,
+        "parallel_seconds": parallel_seconds,
+        "speedup": single_seconds / parallel_seconds,
+        "same_result": bool(
+            np.isclose(single["naive_effect"], parallel["naive_effect"])
+            and np.isclose(single["cem_att"], parallel["cem_att"])
+        ),
+    }
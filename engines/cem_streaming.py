@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from engines.cem import (
+    DEFAULT_EDGES,
+    cem_att_from_counts,
+    merge_counts,
+    naive_effect_from_counts,
+    strata_shape,
+    stratify,
+    stratum_counts,
+    summarize_strata,
+)
+
+
+DEFAULT_CHUNKSIZE = 1_000_000
+
+
+def treated_mask(chunk):
+    """Treatment indicator from a `treated` column or the lesson's `type`"""
+    if "treated" in chunk:
+        return chunk["treated"].to_numpy(dtype=bool)
+    return (chunk["type"] == "premium").to_numpy()
+
+
+def iter_chunks(path, columns, chunksize=DEFAULT_CHUNKSIZE):
+    """Read a CSV or Parquet export in fixed-size row chunks"""
+    path = Path(path)
+    if path.suffix in (".parquet", ".pq"):
+        # pyarrow ships with streamlit; only needed for Parquet input
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        available = set(parquet_file.schema_arrow.names)
+        for batch in parquet_file.iter_batches(
+            batch_size=chunksize, columns=[c for c in columns if c in available]
+        ):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(
+            path,
+            chunksize=chunksize,
+            usecols=lambda name: name in columns,
+        )
+
+
+def stream_cem(path, edges=DEFAULT_EDGES, chunksize=DEFAULT_CHUNKSIZE):
+    """Out-of-core CEM: coarsen each chunk and keep only stratum statistics
+
+    Memory is bounded by the chunk size plus the number of strata, so exports
+    larger than RAM produce the same naive effect and CEM ATT as run_cem.
+    """
+    shape = strata_shape(edges)
+    n_strata = int(np.prod(shape))
+    columns = set(edges) | {"treated", "type", "churned"}
+
+    counts = None
+    n_rows = 0
+    for chunk in iter_chunks(path, columns, chunksize):
+        keys = stratify(chunk, edges)
+        chunk_counts = stratum_counts(
+            keys, treated_mask(chunk), chunk["churned"].to_numpy(), n_strata
+        )
+        counts = chunk_counts if counts is None else merge_counts(counts, chunk_counts)
+        n_rows += len(chunk)
+
+    if counts is None:
+        raise ValueError(f"No rows found in {path}")
+
+    return {
+        "naive_effect": naive_effect_from_counts(counts),
+        "cem_att": cem_att_from_counts(counts),
+        "strata": summarize_strata(counts, edges),
+        "counts": counts,
+        "n_rows": n_rows,
+    }
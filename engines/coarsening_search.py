@@ -0,0 +1,182 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from engines.cem import DEFAULT_EDGES
+
+
+def quantile_candidates(values, max_bins=6, round_to=None):
+    """Candidate edge tuples from quantiles, for 2..max_bins buckets"""
+    values = np.asarray(values, dtype=np.float64)
+    candidates = []
+    for n_bins in range(2, max_bins + 1):
+        cuts = np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1])
+        if round_to is not None:
+            cuts = np.round(cuts / round_to) * round_to
+        cuts = tuple(np.unique(cuts).tolist())
+        if cuts not in candidates:
+            candidates.append(cuts)
+    return candidates
+
+
+class CoarseningSearch:
+    """Evaluate many candidate coarsenings from one pass over the rows
+
+    Every candidate edge of a covariate is merged into one sorted list of
+    "atom" edges. The rows are binned once into the joint atom histogram of
+    treated/control counts and churn sums; any candidate coarsening is then
+    a sum over contiguous atoms (np.add.reduceat) and never touches the rows
+    again.
+
+    Reductions are cached per covariate prefix, so when only the last
+    covariate's edges change the histogram already reduced along the other
+    covariates is reused and only one axis is re-reduced. L1 imbalance is
+    measured on the atom grid, which is the same reference histogram for
+    every candidate.
+    """
+
+    def __init__(self, frame, candidates):
+        self.names = tuple(candidates)
+        self.candidates = {
+            name: [tuple(sorted(set(edges))) for edges in candidates[name]]
+            for name in self.names
+        }
+        self.atom_edges = {
+            name: np.unique(
+                np.concatenate([np.asarray(e) for e in self.candidates[name]])
+            )
+            for name in self.names
+        }
+        self.shape = tuple(len(self.atom_edges[name]) + 1 for name in self.names)
+
+        # The only pass over the rows: one digitize per covariate, one bincount
+        codes = [
+            np.digitize(np.asarray(frame[name]), self.atom_edges[name])
+            for name in self.names
+        ]
+        keys = np.ravel_multi_index(codes, self.shape)
+        n_atoms = int(np.prod(self.shape))
+        treated = np.asarray(frame["treated"], dtype=bool)
+        churned = np.asarray(frame["churned"], dtype=np.float64)
+
+        arm_keys = keys + treated * n_atoms
+        counts = np.bincount(arm_keys, minlength=2 * n_atoms).astype(np.float64)
+        churn = np.bincount(arm_keys, weights=churned, minlength=2 * n_atoms)
+
+        # Stat axis first: n_control, n_treated, churn_control, churn_treated
+        self.atoms = np.stack(
+            [counts[:n_atoms], counts[n_atoms:], churn[:n_atoms], churn[n_atoms:]]
+        ).reshape((4,) + self.shape)
+        self.n_treated = self.atoms[1].sum()
+        self.n_control = self.atoms[0].sum()
+
+        self._reduced = [((), self.atoms)]  # prefix of edges -> reduced stats
+
+    def _atom_to_bucket(self, name, edges):
+        """Coarse bucket of every atom along one covariate"""
+        return np.concatenate(
+            [[0], np.searchsorted(np.asarray(edges), self.atom_edges[name], "right")]
+        )
+
+    def _reduce(self, coarsening):
+        """Coarse stats for a coarsening, reusing the longest cached prefix"""
+        edges = tuple(coarsening[name] for name in self.names)
+
+        depth = 0
+        while (
+            depth < len(self._reduced) - 1
+            and self._reduced[depth + 1][0] == edges[: depth + 1]
+        ):
+            depth += 1
+        del self._reduced[depth + 1 :]
+
+        stats = self._reduced[depth][1]
+        for axis in range(depth, len(self.names)):
+            bucket = self._atom_to_bucket(self.names[axis], edges[axis])
+            starts = np.flatnonzero(np.diff(bucket, prepend=-1))
+            stats = np.add.reduceat(stats, starts, axis=axis + 1)
+            self._reduced.append((edges[: axis + 1], stats))
+
+        return stats
+
+    def evaluate(self, coarsening):
+        """L1 imbalance, matched counts and ATT for one coarsening"""
+        n_control, n_treated, churn_control, churn_treated = self._reduce(coarsening)
+        matched = (n_treated > 0) & (n_control > 0)
+        m_treated = n_treated[matched].sum()
+        m_control = n_control[matched].sum()
+
+        if m_treated == 0:
+            return {
+                "n_strata": int(matched.size),
+                "n_matched_treated": 0,
+                "n_matched_control": 0,
+                "n_matched": 0,
+                "l1": float("nan"),
+                "att": float("nan"),
+            }
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            treated_rate = np.where(matched, churn_treated / n_treated, 0.0)
+            control_rate = np.where(matched, churn_control / n_control, 0.0)
+            control_scale = np.where(matched, n_treated / n_control, 0.0)
+        att = float(((control_rate - treated_rate) * n_treated).sum() / m_treated)
+
+        # Broadcast stratum weights back onto the atom grid for L1
+        index = np.ix_(
+            *[self._atom_to_bucket(name, coarsening[name]) for name in self.names]
+        )
+        treated_freq = self.atoms[1] * matched[index] / m_treated
+        control_freq = self.atoms[0] * control_scale[index] / m_treated
+        l1 = 0.5 * float(np.abs(treated_freq - control_freq).sum())
+
+        return {
+            "n_strata": int(matched.size),
+            "n_matched_treated": int(m_treated),
+            "n_matched_control": int(m_control),
+            "n_matched": int(m_treated + m_control),
+            "l1": l1,
+            "att": att,
+        }
+
+    def raw_l1(self):
+        """L1 imbalance on the atom grid before any matching"""
+        treated_freq = self.atoms[1] / self.n_treated
+        control_freq = self.atoms[0] / self.n_control
+        return 0.5 * float(np.abs(treated_freq - control_freq).sum())
+
+    def run(self):
+        """Evaluate every combination of candidate edges"""
+        rows = []
+        # itertools.product varies the last covariate fastest, so successive
+        # candidates share every reduction except the last axis
+        for combo in itertools.product(*(self.candidates[n] for n in self.names)):
+            coarsening = dict(zip(self.names, combo))
+            rows.append(
+                {
+                    **{f"{n}_edges": e for n, e in coarsening.items()},
+                    **self.evaluate(coarsening),
+                }
+            )
+        return pd.DataFrame(rows)
+
+
+def search_coarsenings(frame, candidates=None, max_bins=6):
+    """Score candidate coarsenings by L1 imbalance, matched units and ATT
+
+    candidates maps each covariate to a list of edge tuples; by default the
+    lesson's edges plus quantile cuts of 2..max_bins buckets are tried.
+    """
+    if candidates is None:
+        candidates = {
+            name: [tuple(DEFAULT_EDGES[name])]
+            + quantile_candidates(frame[name], max_bins=max_bins)
+            for name in DEFAULT_EDGES
+        }
+
+    return (
+        CoarseningSearch(frame, candidates)
+        .run()
+        .sort_values(["l1", "n_matched"], ascending=[True, False], ignore_index=True)
+    )
@@ -0,0 +1,98 @@
+import numpy as np
+
+# Confounder paths of generate_classroom_data: motivation, family support and
+# teacher quality (centred at 50) into weekly hours and into grades
+HOURS_WEIGHTS = np.array([0.3, 0.2, 0.1])
+GRADE_WEIGHTS = np.array([0.4, 0.3, 0.2])
+HOURS_NOISE = 3.0
+GRADE_NOISE = 5.0
+TRUE_HOURS_EFFECT = 0.5
+
+DEFAULT_CHUNK_BYTES = 64 * 2**20
+
+
+def draw_students(rng, n_reps, n_students):
+    """(replications, students, variables) array of one batch of classes
+
+    Variables are motivation, family support, teacher quality (centred),
+    hours noise and grade noise, drawn as in generate_classroom_data.
+    """
+    # float32 normals are drawn about twice as fast as float64 ones
+    draws = rng.standard_normal((n_reps, n_students, 5), dtype=np.float32)
+    draws *= np.array([15, 20, 0, HOURS_NOISE, GRADE_NOISE], dtype=np.float32)
+    draws += np.array([50, 60, 0, 0, 0], dtype=np.float32)
+    draws[..., 2] = rng.integers(0, 4, (n_reps, n_students), dtype=np.int8) * 20 - 20
+    return draws
+
+
+def slope_moments(draws):
+    """Per-replication second moments that fix the naive slope at any strength
+
+    With confounding strength s, hours are s * c_h + e_h and grades are
+    s * c_g + effect * hours + e_g (plus constants), so the naive slope is a
+    ratio of quadratics in s whose coefficients are these moments.
+    """
+    centred = draws - draws.mean(axis=1, keepdims=True)
+
+    # (reps, 5, 5) cross moments of the draws in one batched product, then
+    # mapped to the cross moments of c_h, c_g, e_h and e_g
+    cross = np.matmul(centred.transpose(0, 2, 1), centred).astype(np.float64)
+    mapping = np.zeros((5, 4))
+    mapping[:3, 0] = HOURS_WEIGHTS
+    mapping[:3, 1] = GRADE_WEIGHTS
+    mapping[3, 2] = mapping[4, 3] = 1
+    return mapping.T @ cross @ mapping / draws.shape[1]
+
+
+def slopes_from_moments(cross, strengths, hours_effect=TRUE_HOURS_EFFECT):
+    """(reps, strengths) naive OLS slopes of grades on hours"""
+    s = np.asarray(strengths, dtype=np.float64)[None, :]
+    ch_ch, ch_cg, ch_eh, ch_eg = (cross[:, 0, j, None] for j in range(4))
+    cg_eh = cross[:, 1, 2, None]
+    eh_eh, eh_eg = cross[:, 2, 2, None], cross[:, 2, 3, None]
+
+    var_hours = s * s * ch_ch + 2 * s * ch_eh + eh_eh
+    confounded = s * s * ch_cg + s * (cg_eh + ch_eg) + eh_eg
+    return hours_effect + confounded / var_hours
+
+
+def simulate_naive_slopes(
+    strengths,
+    sample_sizes,
+    n_reps=1_000,
+    hours_effect=TRUE_HOURS_EFFECT,
+    seed=0,
+    chunk_bytes=DEFAULT_CHUNK_BYTES,
+):
+    """Naive slopes for every (sample size, strength) pair: (sizes, strengths, reps)
+
+    Each sample size draws its replications in chunks of at most chunk_bytes.
+    The same draws serve every strength, so the cost grows with the sample
+    sizes and replications but not with the number of strengths.
+    """
+    rng = np.random.default_rng(seed)
+    slopes = np.empty((len(sample_sizes), len(strengths), n_reps))
+
+    for i, n_students in enumerate(sample_sizes):
+        chunk = max(1, int(chunk_bytes // (n_students * 5 * 4)))
+        for start in range(0, n_reps, chunk):
+            stop = min(start + chunk, n_reps)
+            cross = slope_moments(draw_students(rng, stop - start, n_students))
+            slopes[i, :, start:stop] = slopes_from_moments(
+                cross, strengths, hours_effect
+            ).T
+
+    return slopes
+
+
+def summarize_slopes(slopes, hours_effect=TRUE_HOURS_EFFECT):
+    """Mean, spread, bias and central 95% range of simulated slopes"""
+    lower, upper = np.percentile(slopes, [2.5, 97.5], axis=-1)
+    mean = slopes.mean(axis=-1)
+    return {
+        "mean": mean,
+        "std": slopes.std(axis=-1),
+        "bias": mean - hours_effect,
+        "lower": lower,
+        "upper": upper,
+    }
@@ -0,0 +1,43 @@
+import numpy as np
+
+
+def density_tiles(x, y, values=None, bins=(80, 60), x_range=None, y_range=None):
+    """2D histogram of the points inside a range, with the mean of `values`
+
+    Only points inside x_range/y_range are binned, so a zoomed view is
+    re-binned at full tile resolution rather than cropped from the full one.
+    Returns tile centres, counts and (when values are given) the mean value
+    per tile, shaped (y, x) as Plotly heatmaps expect, with NaN for empty
+    tiles.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    x_range = x_range or (x.min(), x.max())
+    y_range = y_range or (y.min(), y.max())
+    n_x, n_y = bins
+
+    # Tile index by arithmetic; the upper edge belongs to the last tile
+    x_span = max(x_range[1] - x_range[0], 1e-12)
+    y_span = max(y_range[1] - y_range[0], 1e-12)
+    ix = np.minimum(((x - x_range[0]) / x_span * n_x).astype(np.int64), n_x - 1)
+    iy = np.minimum(((y - y_range[0]) / y_span * n_y).astype(np.int64), n_y - 1)
+    inside = (
+        (x >= x_range[0]) & (x <= x_range[1]) & (y >= y_range[0]) & (y <= y_range[1])
+    )
+    tile = iy[inside] * n_x + ix[inside]
+
+    counts = np.bincount(tile, minlength=n_x * n_y).reshape(n_y, n_x)
+    tiles = {
+        "x": x_range[0] + (np.arange(n_x) + 0.5) * x_span / n_x,
+        "y": y_range[0] + (np.arange(n_y) + 0.5) * y_span / n_y,
+        "counts": counts,
+    }
+    if values is not None:
+        values = np.asarray(values, dtype=np.float64)[inside]
+        sums = np.bincount(tile, weights=values, minlength=n_x * n_y)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            tiles["mean"] = np.where(
+                counts > 0, sums.reshape(n_y, n_x) / counts, np.nan
+            )
+
+    return tiles
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+from engines.panel_did import cell_sums
+
+CONTROL_GROUPS = ("never", "not_yet")
+
+
+class EventStudy:
+    """Staggered-adoption event study from cohort-by-period cell means
+
+    Units are grouped into cohorts by the first period they are treated
+    (Panel.cohorts). One pass over the panel gives the outcome sum and row
+    count of every cohort in every period. Every estimate afterwards works
+    on that small (cohorts, periods) table, so changing the event window or
+    the aggregation never rescans the rows.
+
+    Cohort-by-period effects follow Callaway and Sant'Anna: a cohort's
+    change since its last untreated period, minus the same change in the
+    comparison group (never-treated units, or every unit not yet treated).
+    Averaging these effects, rather than reading them off one TWFE
+    regression, never uses already-treated units as controls. That is what
+    biases TWFE when effects differ between cohorts or grow over time.
+    """
+
+    def __init__(self, panel):
+        self.periods = panel.periods
+        n_periods = panel.n_periods
+
+        # Cohort n_periods holds the never-treated units
+        self.cohort_sizes = np.bincount(panel.cohorts, minlength=n_periods + 1)
+        counts, sums = cell_sums(
+            panel.cohorts[panel.unit_codes] * n_periods + panel.period_codes,
+            (n_periods + 1) * n_periods,
+            panel.y,
+        )
+        self.counts = counts.reshape(n_periods + 1, n_periods)
+        self.sums = sums.reshape(n_periods + 1, n_periods)
+        self._effects = {}
+
+    def cohort_time_effects(self, control="never"):
+        """ATT of every treated cohort in every period, as a long DataFrame
+
+        Columns are cohort and period (labels), event_time (periods since
+        adoption), att and n_units. Each cohort is measured against its last
+        period before adoption, so event_time -1 is the reference and is
+        left out; cohorts treated from the first period have no reference
+        and are dropped. Computed once per control group from the cells.
+        """
+        if control not in CONTROL_GROUPS:
+            raise ValueError(f"unknown control: {control!r}")
+        if control in self._effects:
+            return self._effects[control]
+
+        n_periods = len(self.periods)
+        cohorts = np.flatnonzero(self.cohort_sizes[1:n_periods]) + 1
+        g = cohorts[:, None]
+        t = np.arange(n_periods)[None, :]
+        base = g - 1
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = self.sums / self.counts
+
+            # Comparison units for (g, t) are cohorts adopting after both t
+            # and the base period: suffix sums over cohorts give every such
+            # group at once. Only the never-treated are after n_periods - 1.
+            later_sums = np.cumsum(self.sums[::-1], axis=0)[::-1][1:]
+            later_counts = np.cumsum(self.counts[::-1], axis=0)[::-1][1:]
+            if control == "never":
+                k = np.full((len(cohorts), n_periods), n_periods - 1)
+            else:
+                k = np.maximum(t, base)
+
+            # For leads k is g - 1, so the suffix still holds cohort g
+            # itself; take its own cells back out so no cohort is its own
+            # comparison
+            own = g > k
+            control_now = (later_sums[k, t] - own * self.sums[g, t]) / (
+                later_counts[k, t] - own * self.counts[g, t]
+            )
+            control_base = (later_sums[k, base] - own * self.sums[g, base]) / (
+                later_counts[k, base] - own * self.counts[g, base]
+            )
+
+            att = (means[g, t] - means[g, base]) - (control_now - control_base)
+
+        effects = pd.DataFrame(
+            {
+                "cohort": np.repeat(self.periods[cohorts], n_periods),
+                "period": np.tile(self.periods, len(cohorts)),
+                "event_time": (t - g).ravel(),
+                "att": att.ravel(),
+                "n_units": np.repeat(self.cohort_sizes[cohorts], n_periods),
+            }
+        )
+        effects = effects[(effects["event_time"] != -1) & effects["att"].notna()]
+        self._effects[control] = effects.reset_index(drop=True)
+        return self._effects[control]
+
+    def _window(self, window, control):
+        effects = self.cohort_time_effects(control)
+        if window is None:
+            return effects
+        low, high = window
+        return effects[effects["event_time"].between(low, high)]
+
+    def event_time_effects(self, window=None, control="never"):
+        """Leads and lags: cohort effects averaged by event time
+
+        Each event time weights the cohorts observed at it by their units.
+        window=(first, last) keeps only those event times.
+        """
+        effects = self._window(window, control)
+        weighted = effects.assign(weighted=effects["att"] * effects["n_units"])
+        grouped = weighted.groupby("event_time")
+        return pd.DataFrame(
+            {
+                "att": grouped["weighted"].sum() / grouped["n_units"].sum(),
+                "n_cohorts": grouped.size(),
+                "n_units": grouped["n_units"].sum(),
+            }
+        )
+
+    def cohort_event_table(self, window=None, control="never"):
+        """(cohorts, event times) table of each cohort's leads and lags"""
+        return self._window(window, control).pivot(
+            index="cohort", columns="event_time", values="att"
+        )
+
+    def overall_att(self, window=None, control="never"):
+        """Average effect over every treated cohort-period, weighted by units
+
+        NaN when the window holds no period at or after adoption.
+        """
+        effects = self._window(window, control)
+        post = effects[effects["event_time"] >= 0]
+        if post.empty:
+            return float("nan")
+        return np.average(post["att"], weights=post["n_units"])
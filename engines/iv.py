@@ -0,0 +1,117 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+def _design(frame, columns):
+    """Constant plus the named columns as one float64 matrix"""
+    return np.column_stack(
+        [np.ones(len(frame))]
+        + [np.asarray(frame[name], dtype=np.float64) for name in columns]
+    )
+
+
+def _p_value(t_stat):
+    """Two-sided p-value under the normal approximation"""
+    return math.erfc(abs(t_stat) / math.sqrt(2))
+
+
+def ordinary_least_squares(frame, outcome, regressors):
+    """OLS of outcome on a constant and regressors, with HC1 standard errors"""
+    return two_stage_least_squares(frame, outcome, regressors, instruments=())
+
+
+def first_stage_statistics(z_exog, z_full, endog):
+    """First-stage F and partial R² of the excluded instruments, per endogenous
+
+    Compares the fit of each endogenous column on all instruments with its
+    fit on the exogenous regressors alone, from two least-squares solves.
+    """
+    n, k_full = z_full.shape
+    q = k_full - z_exog.shape[1]
+
+    resid_full = endog - z_full @ np.linalg.lstsq(z_full, endog, rcond=None)[0]
+    resid_exog = endog - z_exog @ np.linalg.lstsq(z_exog, endog, rcond=None)[0]
+    rss_full = np.einsum("ij,ij->j", resid_full, resid_full)
+    rss_exog = np.einsum("ij,ij->j", resid_exog, resid_exog)
+
+    return {
+        "f_stat": ((rss_exog - rss_full) / q) / (rss_full / (n - k_full)),
+        "partial_r2": 1 - rss_full / rss_exog,
+        "df": (q, n - k_full),
+    }
+
+
+def two_stage_least_squares(
+    frame, outcome, endogenous, instruments, exogenous=(), cov_type="HC1"
+):
+    """2SLS of outcome on endogenous regressors using excluded instruments
+
+    A constant and the exogenous columns instrument themselves. Both stages
+    are QR-based least-squares solves over the full arrays. Standard errors
+    are heteroskedasticity-robust (HC0 or HC1 sandwich) or, with
+    cov_type="nonrobust", the classical 2SLS ones. With no instruments this
+    is OLS.
+    """
+    endogenous, instruments, exogenous = (
+        list(endogenous),
+        list(instruments),
+        list(exogenous),
+    )
+    y = np.asarray(frame[outcome], dtype=np.float64)
+    x = _design(frame, exogenous + endogenous)
+    n, k = x.shape
+
+    if instruments:
+        z_exog = _design(frame, exogenous)
+        z = _design(frame, exogenous + instruments)
+        endog = x[:, len(exogenous) + 1 :]
+
+        # First stage: project the regressors onto the instruments
+        q, _ = np.linalg.qr(z)
+        x_hat = q @ (q.T @ x)
+        first_stage = first_stage_statistics(z_exog, z, endog)
+    else:
+        x_hat = x
+        first_stage = None
+
+    # Second stage, with residuals from the actual (not fitted) regressors
+    params = np.linalg.lstsq(x_hat, y, rcond=None)[0]
+    resid = y - x @ params
+
+    bread = np.linalg.inv(x_hat.T @ x_hat)
+    if cov_type == "nonrobust":
+        cov = bread * (resid @ resid) / (n - k)
+    elif cov_type in ("HC0", "HC1"):
+        meat = (x_hat * (resid**2)[:, None]).T @ x_hat
+        cov = bread @ meat @ bread
+        if cov_type == "HC1":
+            cov *= n / (n - k)
+    else:
+        raise ValueError(f"unknown cov_type: {cov_type!r}")
+
+    std_err = np.sqrt(np.diag(cov))
+    t_stat = params / std_err
+    table = pd.DataFrame(
+        {
+            "coef": params,
+            "std_err": std_err,
+            "t_stat": t_stat,
+            "p_value": [_p_value(t) for t in t_stat],
+        },
+        index=["const"] + exogenous + endogenous,
+    )
+
+    result = {"params": table, "cov": cov, "n": n, "cov_type": cov_type}
+    if first_stage is not None:
+        result["first_stage"] = pd.DataFrame(
+            {
+                "f_stat": first_stage["f_stat"],
+                "partial_r2": first_stage["partial_r2"],
+            },
+            index=endogenous,
+        )
+        result["first_stage_df"] = first_stage["df"]
+    return result
+
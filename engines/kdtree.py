@@ -0,0 +1,216 @@
+import numpy as np
+
+
+class KDTree:
+    """Balanced KD-tree in NumPy with batched, exact k-nearest-neighbour queries
+
+    The tree is implicit: every level splits each node's contiguous block of
+    points at its median, so level l has 2**l nodes and all leaves sit at the
+    same depth. Building sorts once per level, and queries run level by level
+    over arrays of (query, node) pairs rather than one Python call per query.
+
+    Duplicate points are stored once with their multiplicity. Coarse data
+    such as whole-year ages repeats heavily, and searching distinct points
+    keeps the leaves tight; ties are expanded back to points after the search.
+    """
+
+    def __init__(self, points, leaf_size=32):
+        points = np.asarray(points, dtype=np.float64)
+        if points.ndim != 2 or len(points) == 0:
+            raise ValueError("points must be a non-empty (n, d) array")
+
+        self.n_points = len(points)
+
+        # Original indices grouped by distinct point, for expanding ties
+        self.members, self.member_starts, self.member_counts = _group_duplicates(points)
+        points = points[self.members[self.member_starts]]
+
+        n, d = points.shape
+        self.n_distinct = n
+        self.leaf_size = leaf_size
+        self.depth = max(int(np.ceil(np.log2(max(n / leaf_size, 1)))), 0)
+
+        # Bounds of each node's block of the permuted points, per level
+        starts = np.array([0], dtype=np.int64)
+        ends = np.array([n], dtype=np.int64)
+        order = np.arange(n)
+        low = points.min(axis=0)
+        span = np.maximum(points.max(axis=0) - low, 1e-12)
+
+        self.split_dims = []
+        self.split_values = []
+        for level in range(self.depth):
+            dim = level % d
+            # One argsort per level: node id plus the coordinate scaled to [0, 1)
+            node_of = np.repeat(np.arange(len(starts)), ends - starts)
+            scaled = (points[order, dim] - low[dim]) / span[dim] * 0.999
+            order = order[np.argsort(node_of + scaled)]
+
+            mids = starts + (ends - starts) // 2
+            self.split_dims.append(dim)
+            self.split_values.append(points[order[np.minimum(mids, n - 1)], dim])
+
+            starts, ends = (
+                np.stack([starts, mids], axis=1).ravel(),
+                np.stack([mids, ends], axis=1).ravel(),
+            )
+
+        self.order = order
+        self.points = points[order]
+        self.leaf_starts = starts
+        self.leaf_ends = ends
+
+        # Leaf boxes from the points, parent boxes from their two children
+        lo = np.full((len(starts), d), np.inf)
+        hi = np.full((len(starts), d), -np.inf)
+        filled = ends > starts
+        lo[filled] = np.minimum.reduceat(self.points, starts[filled], axis=0)
+        hi[filled] = np.maximum.reduceat(self.points, starts[filled], axis=0)
+        self.box_lo = [lo]
+        self.box_hi = [hi]
+        for _ in range(self.depth):
+            lo = np.minimum(lo[0::2], lo[1::2])
+            hi = np.maximum(hi[0::2], hi[1::2])
+            self.box_lo.insert(0, lo)
+            self.box_hi.insert(0, hi)
+
+    def _leaf_points(self, leaves):
+        """Padded point indices for a batch of leaves (-1 where a leaf is short)"""
+        offsets = np.arange(int((self.leaf_ends - self.leaf_starts).max()))
+        idx = self.leaf_starts[leaves][:, None] + offsets[None, :]
+        return np.where(idx < self.leaf_ends[leaves][:, None], idx, -1)
+
+    def _candidates(self, queries, query_ids, leaves):
+        """Squared distances from queries to every point of a leaf each"""
+        idx = self._leaf_points(leaves)
+        diff = self.points[np.maximum(idx, 0)] - queries[query_ids][:, None, :]
+        dist = np.einsum("pbd,pbd->pb", diff, diff)
+        dist[idx < 0] = np.inf
+        return dist, idx
+
+    def _query_batch(self, queries, k):
+        n_queries = len(queries)
+        all_ids = np.arange(n_queries)
+
+        # Descend to each query's own leaf for a tight starting bound
+        node = np.zeros(n_queries, dtype=np.int64)
+        for level in range(self.depth):
+            dim = self.split_dims[level]
+            go_right = queries[:, dim] >= self.split_values[level][node]
+            node = 2 * node + go_right
+        own_leaf = node
+
+        dist, idx = self._candidates(queries, all_ids, own_leaf)
+        best_dist, best_idx = _top_k(all_ids, dist, idx, n_queries, k)
+        bound = best_dist[:, -1]
+
+        # Branch and bound over (query, node) pairs, one level at a time
+        pair_q = all_ids
+        pair_node = np.zeros(n_queries, dtype=np.int64)
+        for level in range(self.depth + 1):
+            lo = self.box_lo[level][pair_node]
+            hi = self.box_hi[level][pair_node]
+            gap = np.maximum(lo - queries[pair_q], 0) + np.maximum(
+                queries[pair_q] - hi, 0
+            )
+            keep = np.einsum("pd,pd->p", gap, gap) < bound[pair_q]
+            pair_q, pair_node = pair_q[keep], pair_node[keep]
+            if level < self.depth:
+                pair_q = np.repeat(pair_q, 2)
+                pair_node = np.repeat(2 * pair_node, 2) + np.tile(
+                    [0, 1], len(pair_node)
+                )
+
+        # Scan the surviving leaves other than the one already scanned
+        other = pair_node != own_leaf[pair_q]
+        pair_q, pair_node = pair_q[other], pair_node[other]
+        if len(pair_q):
+            dist, idx = self._candidates(queries, pair_q, pair_node)
+            cand_q = np.concatenate(
+                [np.repeat(pair_q, dist.shape[1]), np.repeat(all_ids, k)]
+            )
+            cand_dist = np.concatenate([dist.ravel(), best_dist.ravel()])
+            cand_idx = np.concatenate([idx.ravel(), best_idx.ravel()])
+            best_dist, best_idx = _top_k(
+                cand_q, cand_dist, cand_idx, n_queries, k, flat=True
+            )
+
+        return np.sqrt(best_dist), best_idx
+
+    def _expand_ties(self, dist, cells, k):
+        """k nearest points from the k nearest distinct points, in order"""
+        counts = self.member_counts[cells]
+        ends = np.cumsum(counts, axis=1)
+
+        # Slot s of a query takes the first distinct point whose run covers s
+        slots = np.arange(k)
+        which = (ends[:, :, None] <= slots[None, None, :]).sum(axis=1)
+        rows = np.arange(len(cells))[:, None]
+        offset = slots[None, :] - (ends - counts)[rows, which]
+        chosen = cells[rows, which]
+
+        return dist[rows, which], self.members[self.member_starts[chosen] + offset]
+
+    def query(self, queries, k=1, batch_size=65536):
+        """Distances and original indices of the k nearest points per query"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float64))
+        k = min(k, self.n_points)
+        k_distinct = min(k, self.n_distinct)
+
+        # Repeated queries share one search
+        order, starts, counts = _group_duplicates(queries)
+        distinct = queries[order[starts]]
+        inverse = np.empty(len(queries), dtype=np.int64)
+        inverse[order] = np.repeat(np.arange(len(starts)), counts)
+
+        distances = np.empty((len(distinct), k))
+        indices = np.empty((len(distinct), k), dtype=np.int64)
+        for start in range(0, len(distinct), batch_size):
+            stop = start + batch_size
+            dist, idx = self._query_batch(distinct[start:stop], k_distinct)
+            distances[start:stop], indices[start:stop] = self._expand_ties(
+                dist, self.order[idx], k
+            )
+
+        return distances[inverse], indices[inverse]
+
+
+def _group_duplicates(points):
+    """Row order grouping identical points, with each group's start and size"""
+    order = np.lexsort(points.T[::-1])
+    ordered = points[order]
+    first = np.ones(len(points), dtype=bool)
+    first[1:] = np.any(ordered[1:] != ordered[:-1], axis=1)
+    starts = np.flatnonzero(first)
+    return order, starts, np.diff(starts, append=len(points))
+
+
+def _top_k(query_ids, dist, idx, n_queries, k, flat=False):
+    """k smallest distances per query from a ragged set of candidates"""
+    if not flat:
+        # One row of candidates per query: pad or partition each row directly
+        if dist.shape[1] < k:
+            pad = k - dist.shape[1]
+            dist = np.pad(dist, ((0, 0), (0, pad)), constant_values=np.inf)
+            idx = np.pad(idx, ((0, 0), (0, pad)), constant_values=-1)
+        elif k < dist.shape[1]:
+            keep = np.argpartition(dist, k - 1, axis=1)[:, :k]
+            dist = np.take_along_axis(dist, keep, axis=1)
+            idx = np.take_along_axis(idx, keep, axis=1)
+        order = np.argsort(dist, axis=1)
+        return (
+            np.take_along_axis(dist, order, axis=1),
+            np.take_along_axis(idx, order, axis=1),
+        )
+
+    order = np.lexsort((dist, query_ids))
+    query_ids, dist, idx = query_ids[order], dist[order], idx[order]
+    first = np.searchsorted(query_ids, np.arange(n_queries))
+    take = first[:, None] + np.arange(k)[None, :]
+    take = np.minimum(take, len(dist) - 1)
+    valid = query_ids[take] == np.arange(n_queries)[:, None]
+
+    return (
+        np.where(valid, dist[take], np.inf),
+        np.where(valid, idx[take], -1),
+    )
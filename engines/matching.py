@@ -0,0 +1,151 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from engines.cem import COVARIATES, DEFAULT_EDGES, run_cem
+from engines.kdtree import KDTree
+
+
+def standardize(frame, covariates=COVARIATES):
+    """Covariates as an (n, d) array scaled to zero mean and unit variance"""
+    values = np.column_stack(
+        [np.asarray(frame[name], dtype=np.float64) for name in covariates]
+    )
+    scale = values.std(axis=0)
+    return (values - values.mean(axis=0)) / np.where(scale > 0, scale, 1.0)
+
+
+def _match_summary(treated_churn, neighbour_churn, valid, n_control, used):
+    """ATT and unmatched counts from per-treated neighbour outcomes"""
+    n_valid = valid.sum(axis=1)
+    matched = n_valid > 0
+    control_mean = np.where(valid, neighbour_churn, 0.0).sum(axis=1) / np.maximum(
+        n_valid, 1
+    )
+
+    # Same sign convention as the lesson: free churn minus premium churn
+    att = (
+        float((control_mean - treated_churn)[matched].mean())
+        if matched.any()
+        else float("nan")
+    )
+    return {
+        "att": att,
+        "n_matched_treated": int(matched.sum()),
+        "n_unmatched_treated": int((~matched).sum()),
+        "n_unmatched_control": int(n_control - len(used)),
+    }
+
+
+def nearest_neighbour_match(frame, k=1, caliper=None, leaf_size=32):
+    """k nearest controls per treated unit on standardised covariates
+
+    Controls are matched with replacement. With a caliper (in standard
+    deviations) neighbours further away are dropped, and treated units with
+    no neighbour inside it count as unmatched.
+    """
+    points = standardize(frame)
+    treated = np.asarray(frame["treated"], dtype=bool)
+    churned = np.asarray(frame["churned"], dtype=np.float64)
+    control_rows = np.flatnonzero(~treated)
+
+    tree = KDTree(points[control_rows], leaf_size=leaf_size)
+    distances, neighbours = tree.query(points[treated], k=k)
+
+    valid = neighbours >= 0
+    if caliper is not None:
+        valid &= distances <= caliper
+    neighbour_churn = churned[control_rows][np.maximum(neighbours, 0)]
+
+    return _match_summary(
+        churned[treated],
+        neighbour_churn,
+        valid,
+        len(control_rows),
+        np.unique(neighbours[valid]),
+    )
+
+
+def stratified_k_to_one_match(frame, k=2, edges=DEFAULT_EDGES, leaf_size=32):
+    """k:1 matching: k nearest controls per treated unit within its CEM stratum
+
+    Each stratum gets its own KD-tree over its controls. Strata without
+    controls leave their treated units unmatched; strata with fewer than k
+    controls match on all of them.
+    """
+    points = standardize(frame, tuple(edges))
+    treated = np.asarray(frame["treated"], dtype=bool)
+    churned = np.asarray(frame["churned"], dtype=np.float64)
+    keys = run_cem(frame, edges)["keys"]
+
+    treated_rows = np.flatnonzero(treated)
+    neighbour_churn = np.zeros((len(treated_rows), k))
+    valid = np.zeros((len(treated_rows), k), dtype=bool)
+    used = []
+
+    # Row of each treated unit in the per-treated result arrays
+    position = np.empty(len(frame), dtype=np.int64)
+    position[treated_rows] = np.arange(len(treated_rows))
+    for stratum in np.unique(keys[treated_rows]):
+        in_stratum = keys == stratum
+        stratum_treated = np.flatnonzero(in_stratum & treated)
+        stratum_controls = np.flatnonzero(in_stratum & ~treated)
+        if len(stratum_controls) == 0:
+            continue
+
+        tree = KDTree(points[stratum_controls], leaf_size=leaf_size)
+        _, neighbours = tree.query(points[stratum_treated], k=k)
+        found = neighbours.shape[1]
+        rows = position[stratum_treated]
+
+        neighbour_churn[rows, :found] = churned[stratum_controls][neighbours]
+        valid[rows, :found] = True
+        used.append(stratum_controls[np.unique(neighbours)])
+
+    used = np.concatenate(used) if used else np.array([], dtype=np.int64)
+    return _match_summary(
+        churned[treated_rows], neighbour_churn, valid, int((~treated).sum()), used
+    )
+
+
+def compare_matching_estimators(frame, k=2, caliper=None):
+    """ATT, unmatched units and wall time for CEM, k:1 and nearest-neighbour"""
+    rows = []
+
+    start = time.perf_counter()
+    cem = run_cem(frame)
+    strata = cem["strata"]
+    unmatched = strata[~strata["matched"]]
+    rows.append(
+        {
+            "estimator": "Coarsened exact matching",
+            "att": cem["cem_att"],
+            "n_matched_treated": int(strata.loc[strata["matched"], "n_treated"].sum()),
+            "n_unmatched_treated": int(unmatched["n_treated"].sum()),
+            "n_unmatched_control": int(unmatched["n_control"].sum()),
+            "seconds": time.perf_counter() - start,
+        }
+    )
+
+    start = time.perf_counter()
+    result = stratified_k_to_one_match(frame, k=k)
+    rows.append(
+        {
+            "estimator": f"{k}:1 matching within strata",
+            **result,
+            "seconds": time.perf_counter() - start,
+        }
+    )
+
+    start = time.perf_counter()
+    result = nearest_neighbour_match(frame, k=1, caliper=caliper)
+    rows.append(
+        {
+            "estimator": "Nearest-neighbour matching",
+            **result,
+            "seconds": time.perf_counter() - start,
+        }
+    )
+
+    return pd.DataFrame(rows)
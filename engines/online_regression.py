@@ -0,0 +1,152 @@
+import numpy as np
+
+
+class OnlineRegression:
+    """Simple regression of y on x from running, centred sufficient statistics
+
+    Keeps n, the means and the centred second moments (Welford's updates)
+    rather than raw sums, which lose precision when squared values are
+    large. Observations can be added or removed one at a time or in batches
+    (Chan's pairwise merge), and slope, intercept and r come straight from
+    the statistics without revisiting any data.
+
+    The range of x is tracked alongside for drawing the fitted line. Extremes
+    cannot be taken back out, so after removals min_x and max_x bound the
+    remaining x values rather than match them.
+    """
+
+    __slots__ = ("n", "mean_x", "mean_y", "m2_x", "m2_y", "c_xy", "min_x", "max_x")
+
+    def __init__(self, x=(), y=()):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0  # sum of (x - mean_x)**2
+        self.m2_y = 0.0  # sum of (y - mean_y)**2
+        self.c_xy = 0.0  # sum of (x - mean_x) * (y - mean_y)
+        self.min_x = float("inf")
+        self.max_x = float("-inf")
+        if len(x):
+            self.add_many(x, y)
+
+    def copy(self):
+        other = OnlineRegression()
+        for name in self.__slots__:
+            setattr(other, name, getattr(self, name))
+        return other
+
+    def add(self, x, y):
+        """Add one observation in O(1)"""
+        n = self.n + 1
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.mean_x += dx / n
+        self.mean_y += dy / n
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+        self.c_xy += dx * (y - self.mean_y)
+        self.min_x = min(self.min_x, x)
+        self.max_x = max(self.max_x, x)
+        self.n = n
+
+    def remove(self, x, y):
+        """Remove one previously added observation in O(1)"""
+        if self.n <= 1:
+            self.__init__()
+            return
+
+        n = self.n - 1
+        old_mean_y = self.mean_y
+        dx = x - self.mean_x
+        self.mean_x -= dx / n
+        self.mean_y -= (y - self.mean_y) / n
+        self.m2_x -= dx * (x - self.mean_x)
+        self.m2_y -= (y - self.mean_y) * (y - old_mean_y)
+        self.c_xy -= (x - self.mean_x) * (y - old_mean_y)
+        self.n = n
+
+    @staticmethod
+    def _batch(x, y):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        mean_x, mean_y = x.mean(), y.mean()
+        dx, dy = x - mean_x, y - mean_y
+        return len(x), mean_x, mean_y, dx @ dx, dy @ dy, dx @ dy
+
+    def _merge(self, n_b, mean_x_b, mean_y_b, m2_x_b, m2_y_b, c_xy_b):
+        n = self.n + n_b
+        dx = mean_x_b - self.mean_x
+        dy = mean_y_b - self.mean_y
+        weight = self.n * n_b / n
+        self.mean_x += dx * n_b / n
+        self.mean_y += dy * n_b / n
+        self.m2_x += m2_x_b + dx * dx * weight
+        self.m2_y += m2_y_b + dy * dy * weight
+        self.c_xy += c_xy_b + dx * dy * weight
+        self.n = n
+
+    def add_many(self, x, y):
+        """Add a batch of observations with one vectorised pass over it"""
+        if len(x):
+            self._merge(*self._batch(x, y))
+            self.min_x = min(self.min_x, float(np.min(x)))
+            self.max_x = max(self.max_x, float(np.max(x)))
+
+    def remove_many(self, x, y):
+        """Remove a batch of previously added observations"""
+        if not len(x):
+            return
+        n_b, mean_x_b, mean_y_b, m2_x_b, m2_y_b, c_xy_b = self._batch(x, y)
+        n = self.n - n_b
+        if n <= 0:
+            self.__init__()
+            return
+
+        # Undo the pairwise merge: recover the remaining part's statistics
+        mean_x = (self.n * self.mean_x - n_b * mean_x_b) / n
+        mean_y = (self.n * self.mean_y - n_b * mean_y_b) / n
+        dx = mean_x_b - mean_x
+        dy = mean_y_b - mean_y
+        weight = n * n_b / self.n
+        self.m2_x -= m2_x_b + dx * dx * weight
+        self.m2_y -= m2_y_b + dy * dy * weight
+        self.c_xy -= c_xy_b + dx * dy * weight
+        self.mean_x, self.mean_y, self.n = mean_x, mean_y, n
+
+    def merge(self, other):
+        """Combined statistics of two disjoint sets of observations"""
+        merged = self.copy()
+        if other.n:
+            merged._merge(
+                other.n, other.mean_x, other.mean_y, other.m2_x, other.m2_y, other.c_xy
+            )
+            merged.min_x = min(merged.min_x, other.min_x)
+            merged.max_x = max(merged.max_x, other.max_x)
+        return merged
+
+    @property
+    def slope(self):
+        return self.c_xy / self.m2_x if self.m2_x > 0 else float("nan")
+
+    @property
+    def intercept(self):
+        return self.mean_y - self.slope * self.mean_x
+
+    @property
+    def r(self):
+        denominator = np.sqrt(self.m2_x * self.m2_y)
+        return self.c_xy / denominator if denominator > 0 else float("nan")
+
+    def predict(self, x):
+        return self.intercept + self.slope * np.asarray(x, dtype=np.float64)
+
+    def sums(self):
+        """Raw sums n, Σx, Σy, Σxy, Σx² and Σy², derived from the centred form"""
+        return {
+            "n": self.n,
+            "sum_x": self.n * self.mean_x,
+            "sum_y": self.n * self.mean_y,
+            "sum_xy": self.c_xy + self.n * self.mean_x * self.mean_y,
+            "sum_xx": self.m2_x + self.n * self.mean_x**2,
+            "sum_yy": self.m2_y + self.n * self.mean_y**2,
+        }
@@ -0,0 +1,254 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+def cell_sums(codes, n_cells, values):
+    """Counts and sums of values in each integer cell, via two bincounts"""
+    counts = np.bincount(codes, minlength=n_cells)
+    sums = np.bincount(codes, weights=values, minlength=n_cells)
+    return counts, sums
+
+
+class Panel:
+    """Long-format panel of (unit, period, treated, outcome) rows, encoded once
+
+    Units and periods are factorised to integer codes on construction, so
+    every estimate afterwards is a few bincounts over flat arrays. treated
+    marks rows whose unit has the feature in that period; a unit's cohort
+    is the first period it is treated (n_periods for never-treated units).
+    """
+
+    def __init__(
+        self, frame, unit="unit", period="period", treated="treated", outcome="outcome"
+    ):
+        self.unit_codes, self.units = pd.factorize(frame[unit], sort=True)
+        self.period_codes, self.periods = pd.factorize(frame[period], sort=True)
+        self.treated = np.asarray(frame[treated], dtype=bool)
+        self.y = np.asarray(frame[outcome], dtype=np.float64)
+        self.n_units = len(self.units)
+        self.n_periods = len(self.periods)
+
+        self.cohorts = np.full(self.n_units, self.n_periods)
+        np.minimum.at(
+            self.cohorts,
+            self.unit_codes[self.treated],
+            self.period_codes[self.treated],
+        )
+        self.ever_treated = self.cohorts < self.n_periods
+
+    def __len__(self):
+        return len(self.y)
+
+    def is_balanced(self):
+        """Whether every unit has exactly one row in every period"""
+        if len(self) != self.n_units * self.n_periods:
+            return False
+        cells = self.unit_codes * self.n_periods + self.period_codes
+        return np.bincount(cells, minlength=len(self)).max() == 1
+
+    def group_time_means(self):
+        """Mean outcome and row count of ever-treated and control units per period"""
+        group = self.ever_treated[self.unit_codes]
+        counts, sums = cell_sums(
+            group * self.n_periods + self.period_codes, 2 * self.n_periods, self.y
+        )
+        counts = counts.reshape(2, self.n_periods)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums.reshape(2, self.n_periods) / counts
+        return pd.DataFrame(
+            {
+                "control": means[0],
+                "treated": means[1],
+                "n_control": counts[0],
+                "n_treated": counts[1],
+            },
+            index=pd.Index(self.periods, name="period"),
+        )
+
+    def did_2x2(self, post_start=None):
+        """Classic 2×2 difference-in-differences from the group-time means
+
+        Pools every period before post_start (default: the first adoption)
+        against every period from it on, weighting periods by their rows.
+        With staggered adoption later cohorts count as treated throughout;
+        the event study separates them.
+        """
+        if not self.ever_treated.any():
+            raise ValueError("no unit is ever treated")
+        means = self.group_time_means()
+        if post_start is None:
+            post_start = self.periods[self.cohorts[self.ever_treated].min()]
+        post = means.index >= post_start
+
+        def pooled(group, rows):
+            counts = means.loc[rows, f"n_{group}"]
+            return (means.loc[rows, group] * counts).sum() / counts.sum()
+
+        result = {
+            "post_start": post_start,
+            "treated_pre": pooled("treated", ~post),
+            "treated_post": pooled("treated", post),
+            "control_pre": pooled("control", ~post),
+            "control_post": pooled("control", post),
+        }
+        result["treated_change"] = result["treated_post"] - result["treated_pre"]
+        result["control_change"] = result["control_post"] - result["control_pre"]
+        result["did"] = result["treated_change"] - result["control_change"]
+        return result
+
+    def absorb(self, values, tol=1e-8, max_iter=1_000):
+        """Residual of values on unit and period fixed effects, and iterations
+
+        Alternating projections: sweep out unit means, then period means,
+        and repeat until a period sweep moves nothing by more than tol. A
+        balanced panel converges on the first sweep; unbalanced ones take a
+        few more. Each sweep is two bincounts, so memory stays linear in
+        rows and no dummy matrix is ever built.
+        """
+        resid = np.array(values, dtype=np.float64)
+        unit_counts = np.bincount(self.unit_codes, minlength=self.n_units)
+        period_counts = np.bincount(self.period_codes, minlength=self.n_periods)
+
+        for iteration in range(1, max_iter + 1):
+            unit_means = np.bincount(
+                self.unit_codes, weights=resid, minlength=self.n_units
+            )
+            resid -= (unit_means / unit_counts)[self.unit_codes]
+            period_means = (
+                np.bincount(self.period_codes, weights=resid, minlength=self.n_periods)
+                / period_counts
+            )
+            resid -= period_means[self.period_codes]
+            if np.abs(period_means).max() < tol:
+                return resid, iteration
+
+        raise RuntimeError(f"fixed effects did not converge in {max_iter} sweeps")
+
+    def twfe_fit(self, clusters=None, tol=1e-8, max_iter=1_000):
+        """TWFE treatment coefficient with cluster-robust standard error
+
+        Both outcome and treatment are residualised on unit and period
+        effects (absorb), so the coefficient is one ratio of dot products.
+        The standard error is the CR1 sandwich over clusters, e.g. each
+        row's territory; with no clusters every row is its own cluster
+        (HC1). When units are nested in clusters their effects are not
+        counted as parameters in the small-sample correction.
+        """
+        d, iterations = self.absorb(self.treated, tol, max_iter)
+        y, more = self.absorb(self.y, tol, max_iter)
+        dd = d @ d
+        if dd == 0:
+            raise ValueError("treatment does not vary within units and periods")
+        coef = (d @ y) / dd
+        resid = y - coef * d
+
+        n = len(self)
+        if clusters is None:
+            cluster_codes, n_clusters = np.arange(n), n
+        else:
+            cluster_codes, labels = pd.factorize(np.asarray(clusters))
+            n_clusters = len(labels)
+        scores = np.bincount(cluster_codes, weights=d * resid, minlength=n_clusters)
+
+        # Parameters: the treatment plus period effects (with the constant),
+        # and unit effects unless each unit sits inside a single cluster
+        n_params = 1 + self.n_periods
+        if clusters is None or not self._nested_in(cluster_codes):
+            n_params += self.n_units - 1
+        correction = n_clusters / (n_clusters - 1) * (n - 1) / (n - n_params)
+        std_err = math.sqrt(correction * (scores @ scores)) / dd
+        t_stat = coef / std_err
+
+        return {
+            "coef": coef,
+            "std_err": std_err,
+            "t_stat": t_stat,
+            "p_value": math.erfc(abs(t_stat) / math.sqrt(2)),
+            "n": n,
+            "n_clusters": n_clusters,
+            "iterations": max(iterations, more),
+        }
+
+    def _nested_in(self, cluster_codes):
+        """Whether every unit's rows share one cluster"""
+        lowest = np.full(self.n_units, np.iinfo(np.int64).max)
+        highest = np.full(self.n_units, -1)
+        np.minimum.at(lowest, self.unit_codes, cluster_codes)
+        np.maximum.at(highest, self.unit_codes, cluster_codes)
+        return bool((lowest == highest).all())
+
+    def twfe(self):
+        """Treatment coefficient of outcome on treated with unit and period effects"""
+        return self.twfe_fit()["coef"]
+
+
+def wide_to_panel(periods, outcomes, adoption):
+    """Long panel from one outcome series per unit
+
+    outcomes maps each unit to its outcomes over periods; adoption maps
+    treated units to the first period they have the feature.
+    """
+    frames = []
+    for unit, series in outcomes.items():
+        start = adoption.get(unit)
+        frames.append(
+            pd.DataFrame(
+                {
+                    "unit": unit,
+                    "period": periods,
+                    "treated": [start is not None and p >= start for p in periods],
+                    "outcome": series,
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def simulate_panel(
+    n_units,
+    n_periods,
+    adoption_periods=(None, 50),
+    effect=5.0,
+    n_territories=50,
+    seed=0,
+    effect_growth=0.0,
+):
+    """Synthetic retention panel: unit, territory, period, treated, outcome
+
+    Units are spread over territories and each territory adopts in one of
+    adoption_periods, taken in turn (None never adopts). Outcomes are a
+    unit level, a shared trend, a territory shock per period, the feature
+    effect and noise. The effect is effect in the adoption period and grows
+    by effect_growth every period after it. Periods run from 0.
+    """
+    rng = np.random.default_rng(seed)
+    territory_of_unit = rng.integers(0, n_territories, n_units).astype(np.int32)
+    adoption = np.array(
+        [
+            n_periods if start is None else start
+            for start in adoption_periods * (n_territories // len(adoption_periods) + 1)
+        ][:n_territories]
+    )
+
+    unit = np.repeat(np.arange(n_units, dtype=np.int32), n_periods)
+    period = np.tile(np.arange(n_periods, dtype=np.int32), n_units)
+    territory = territory_of_unit[unit]
+    treated = period >= adoption[territory]
+
+    outcome = rng.normal(0, 2, n_units * n_periods)
+    outcome += rng.normal(60, 5, n_units)[unit]
+    outcome += 0.2 * period
+    outcome += rng.normal(0, 1, (n_territories, n_periods))[territory, period]
+    outcome += treated * (effect + effect_growth * (period - adoption[territory]))
+
+    return pd.DataFrame(
+        {
+            "unit": unit,
+            "territory": territory,
+            "period": period,
+            "treated": treated,
+            "outcome": outcome,
+        }
+    )
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+
+def _givens(a, b):
+    """Cosine and sine of the rotation taking (a, b) to (r, 0)"""
+    r = np.hypot(a, b)
+    if r == 0:
+        return 1.0, 0.0
+    return a / r, b / r
+
+
+class RegressionAdjuster:
+    """Treatment coefficient under any subset of covariates from one QR
+
+    The full design (constant, treatment, every covariate) is factorised
+    once as X = QR, keeping only R and Q'y. Every subset's design is
+    Q R[:, subset], so its regression only needs the triangular factor of
+    the small matrix R[:, subset]. That factor is kept current with Givens
+    rotations: dropping a covariate deletes its column and re-triangularises,
+    adding one appends its rotated column of R. Neither step touches the
+    rows of the data.
+    """
+
+    def __init__(self, frame, outcome, treatment, covariates):
+        self.names = ["const", treatment] + list(covariates)
+        x = np.column_stack(
+            [np.ones(len(frame))]
+            + [np.asarray(frame[name], dtype=np.float64) for name in self.names[1:]]
+        )
+        y = np.asarray(frame[outcome], dtype=np.float64)
+
+        q, self.r = np.linalg.qr(x)
+        self.qty = q.T @ y
+        self.n = len(y)
+        self.rss_full = y @ y - self.qty @ self.qty
+
+        # Start with every column; `basis` accumulates the rotations applied
+        self.columns = list(range(len(self.names)))
+        self.factor = self.r.copy()
+        self.basis = np.eye(len(self.names))
+        self.rotated_qty = self.qty.copy()
+
+    def copy(self):
+        """Independent selection state sharing the (read-only) factorisation"""
+        other = object.__new__(RegressionAdjuster)
+        other.__dict__.update(self.__dict__)
+        other.columns = list(self.columns)
+        other.factor = self.factor.copy()
+        other.basis = self.basis.copy()
+        other.rotated_qty = self.rotated_qty.copy()
+        return other
+
+    def _rotate(self, i, j, c, s):
+        """Apply one rotation to rows i and j of the current factor"""
+        for rows in (self.factor, self.rotated_qty):
+            rows[[i, j]] = np.array([[c, s], [-s, c]]) @ rows[[i, j]]
+        self.basis[:, [i, j]] = self.basis[:, [i, j]] @ np.array([[c, -s], [s, c]])
+
+    def remove(self, name):
+        """Drop a covariate: delete its column and re-triangularise"""
+        position = self.columns.index(self.names.index(name))
+        del self.columns[position]
+        self.factor = np.delete(self.factor, position, axis=1)
+
+        # Columns after the deleted one now have one entry below the diagonal
+        for i in range(position, len(self.columns)):
+            c, s = _givens(self.factor[i, i], self.factor[i + 1, i])
+            self._rotate(i, i + 1, c, s)
+            self.factor[i + 1, i] = 0.0
+
+    def add(self, name):
+        """Bring a covariate back: append its rotated column of R"""
+        column = self.names.index(name)
+        m = len(self.columns)
+        self.columns.append(column)
+        self.factor = np.column_stack([self.factor, self.basis.T @ self.r[:, column]])
+
+        # Zero the new column below its diagonal, from the bottom up
+        for i in range(len(self.names) - 1, m, -1):
+            c, s = _givens(self.factor[i - 1, m], self.factor[i, m])
+            self._rotate(i - 1, i, c, s)
+            self.factor[i, m] = 0.0
+
+    def select(self, covariates):
+        """Update the model to control for exactly these covariates"""
+        wanted = {self.names.index(name) for name in covariates}
+        for column in list(self.columns[2:]):
+            if column not in wanted:
+                self.remove(self.names[column])
+        for column in sorted(wanted - set(self.columns)):
+            self.add(self.names[column])
+
+    def fit(self, covariates=None):
+        """Coefficients and classical standard errors of the current model"""
+        if covariates is not None:
+            self.select(covariates)
+
+        m = len(self.columns)
+        triangle = self.factor[:m, :m]
+        params = np.linalg.solve(triangle, self.rotated_qty[:m])
+        rss = self.rss_full + self.rotated_qty[m:] @ self.rotated_qty[m:]
+
+        inverse = np.linalg.inv(triangle)
+        cov = inverse @ inverse.T * rss / (self.n - m)
+        return pd.DataFrame(
+            {"coef": params, "std_err": np.sqrt(np.diag(cov))},
+            index=[self.names[column] for column in self.columns],
+        )
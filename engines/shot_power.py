@@ -0,0 +1,175 @@
+import numpy as np
+
+# Shot spread of generate_target_data in what_is_causality: a base spread,
+# three inches more at full hangover and a little more in the morning
+BASE_SPREAD = 2.0
+HANGOVER_SPREAD = 3.0
+MORNING_SPREAD = 0.2
+
+DEFAULT_N_TESTS = 100_000
+DEFAULT_CHUNK_BYTES = 64 * 2**20
+
+
+def shot_spread(hangover_severity, morning=True):
+    """Standard deviation of each shot coordinate, in inches"""
+    return BASE_SPREAD + hangover_severity * HANGOVER_SPREAD + MORNING_SPREAD * morning
+
+
+def unit_scores(rng, n_tests, n_rifles, n_shots):
+    """(tests, rifles) calculate_accuracy_score of unit-spread shot groups
+
+    All shots of the batch are drawn as one (tests, rifles, shots, 2) array
+    and scored with a single np.hypot and mean over the shots. Distances
+    scale with the spread, so one unit batch serves every spread.
+    """
+    shots = rng.standard_normal((n_tests, n_rifles, n_shots, 2), dtype=np.float32)
+    return np.hypot(shots[..., 0], shots[..., 1]).mean(axis=-1, dtype=np.float64)
+
+
+def simulate_design(
+    n_shots,
+    n_rifles=1,
+    n_tests=DEFAULT_N_TESTS,
+    rifle_sd=0.0,
+    seed=0,
+    chunk_bytes=DEFAULT_CHUNK_BYTES,
+):
+    """Unit-spread scores of n_tests simulated rifle tests: (hungover, sober)
+
+    Each test has n_rifles rifles firing one group of n_shots after a heavy
+    night and one after a sober night. A rifle's spread is scaled by
+    exp(rifle_sd * z) in both sessions, so rifles differ but each is its
+    own control. The returned arrays are the per-test mean scores over
+    rifles at unit spread; multiplying by shot_spread gives real scores.
+    """
+    rng = np.random.default_rng(seed)
+    hungover = np.empty(n_tests)
+    sober = np.empty(n_tests)
+
+    chunk = max(1, int(chunk_bytes // (2 * n_rifles * n_shots * 2 * 4)))
+    for start in range(0, n_tests, chunk):
+        stop = min(start + chunk, n_tests)
+        rifle_scale = np.exp(rifle_sd * rng.standard_normal((stop - start, n_rifles)))
+        for out in (hungover, sober):
+            scores = unit_scores(rng, stop - start, n_rifles, n_shots)
+            out[start:stop] = (scores * rifle_scale).mean(axis=1)
+
+    return hungover, sober
+
+
+def spread_statistic(hungover, sober):
+    """Log of the hungover over the sober score, free of the shot scale
+
+    Scores scale with the spread, so multiplying both groups' spreads by
+    any factor leaves the statistic unchanged.
+    """
+    return np.log(hungover / sober)
+
+
+def design_power(hungover, sober, spread_ratios, alpha=0.05):
+    """Power of a one-sided test that the hangover widens the groups
+
+    The statistic is spread_statistic, so the test needs no assumed sober
+    spread. Its critical value is the 1 - alpha quantile of the statistic
+    with no hangover, simulated from the same draws, so no distributional
+    assumption is needed either. A hangover shifts the statistic by the log
+    of spread_ratios, hungover over sober shot spreads.
+    """
+    log_ratio = spread_statistic(hungover, sober)
+    critical = np.quantile(log_ratio, 1 - alpha)
+    shifts = np.log(np.atleast_1d(np.asarray(spread_ratios, dtype=np.float64)))
+    return np.array([np.mean(shift + log_ratio > critical) for shift in shifts])
+
+
+def hangover_power(
+    hangover_severities,
+    n_shots,
+    n_rifles=1,
+    alpha=0.05,
+    n_tests=DEFAULT_N_TESTS,
+    rifle_sd=0.0,
+    seed=0,
+):
+    """Power to detect each hangover severity in a morning rifle test"""
+    hungover, sober = simulate_design(n_shots, n_rifles, n_tests, rifle_sd, seed)
+    severities = np.asarray(hangover_severities, dtype=np.float64)
+    return design_power(
+        hungover, sober, shot_spread(severities) / shot_spread(0), alpha
+    )
+
+
+def power_grid(
+    hangover_severities,
+    sizes,
+    vary="shots",
+    n_shots=10,
+    n_rifles=1,
+    alpha=0.05,
+    n_tests=DEFAULT_N_TESTS,
+    rifle_sd=0.0,
+    seed=0,
+):
+    """(sizes, severities) power as shots per rifle or rifles grow
+
+    One simulation per size serves every severity.
+    """
+    if vary not in ("shots", "rifles"):
+        raise ValueError(f"unknown vary: {vary!r}")
+
+    return np.array(
+        [
+            hangover_power(
+                hangover_severities,
+                size if vary == "shots" else n_shots,
+                n_rifles if vary == "shots" else size,
+                alpha,
+                n_tests,
+                rifle_sd,
+                seed,
+            )
+            for size in sizes
+        ]
+    )
+
+
+def required_sample_size(
+    hangover_severity,
+    target_power=0.8,
+    vary="shots",
+    n_shots=10,
+    n_rifles=1,
+    max_size=256,
+    alpha=0.05,
+    n_tests=DEFAULT_N_TESTS,
+    rifle_sd=0.0,
+    seed=0,
+):
+    """Smallest shots per rifle (or rifles) reaching target_power, else None
+
+    vary="shots" searches shots per rifle with n_rifles fixed; vary="rifles"
+    searches rifles with n_shots fixed. Doubles the size until the power is
+    reached, then bisects. Every candidate reuses the seed, so the search
+    compares designs on common random numbers.
+    """
+    if vary not in ("shots", "rifles"):
+        raise ValueError(f"unknown vary: {vary!r}")
+
+    def power_at(size):
+        shots, rifles = (size, n_rifles) if vary == "shots" else (n_shots, size)
+        return hangover_power(
+            [hangover_severity], shots, rifles, alpha, n_tests, rifle_sd, seed
+        )[0]
+
+    low, high = 0, 1
+    while power_at(high) < target_power:
+        if high >= max_size:
+            return None
+        low, high = high, min(2 * high, max_size)
+
+    while high - low > 1:
+        middle = (low + high) // 2
+        if power_at(middle) >= target_power:
+            high = middle
+        else:
+            low = middle
+    return high
@@ -0,0 +1,105 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+# One fixed-width record per user; shared read-only across sessions
+USER_DTYPE = np.dtype(
+    [
+        ("id", "U8"),
+        ("type", "U7"),
+        ("age", np.uint8),
+        ("income", np.uint32),
+        ("churned", np.bool_),
+    ]
+)
+
+
+def build_user_store(users):
+    """Pack a list of user dicts into a read-only structured array"""
+    store = np.array(
+        [(u["id"], u["type"], u["age"], u["income"], u["churned"]) for u in users],
+        dtype=USER_DTYPE,
+    )
+    store.flags.writeable = False
+    return store
+
+
+def store_to_frame(store):
+    """Columnar frame for the CEM engine, straight from the store fields"""
+    return pd.DataFrame(
+        {
+            "id": store["id"],
+            "treated": store["type"] == "premium",
+            "age": store["age"].astype(np.float64),
+            "income": store["income"].astype(np.float64),
+            "churned": store["churned"],
+        }
+    )
+
+
+def row_bitmap(rows):
+    """Bitmap (as a Python int) with one bit set per row index"""
+    bitmap = 0
+    for row in rows:
+        bitmap |= 1 << int(row)
+    return bitmap
+
+
+class MatchState:
+    """Per-session matching progress over a shared user store
+
+    Only row indices are kept: a bitmap of currently selected users, a
+    bitmap of matched users and the list of saved (premium, free) pairs.
+    """
+
+    __slots__ = ("selected", "matched", "pairs")
+
+    def __init__(self):
+        self.selected = 0
+        self.matched = 0
+        self.pairs = []
+
+    def select(self, row, type_bitmap):
+        """Select a row, replacing any selected row of the same type"""
+        self.selected = (self.selected & ~type_bitmap) | (1 << row)
+
+    def selected_row(self, type_bitmap):
+        """Selected row of a type, or None"""
+        bits = self.selected & type_bitmap
+        return bits.bit_length() - 1 if bits else None
+
+    def save_pair(self, premium_row, free_row):
+        """Record a matched pair and clear the selection"""
+        self.pairs.append((premium_row, free_row))
+        self.matched |= (1 << premium_row) | (1 << free_row)
+        self.selected = 0
+
+    def n_unmatched(self, type_bitmap):
+        """Number of rows of a type not yet matched"""
+        return (type_bitmap & ~self.matched).bit_count()
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate retained bytes of an object graph"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    # ndarray reports its own buffer (and only the header for views)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(
+            deep_sizeof(getattr(obj, name), seen)
+            for name in obj.__slots__
+            if hasattr(obj, name)
+        )
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    return size
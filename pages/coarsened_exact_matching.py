@@ -3,6 +3,18 @@ import plotly.graph_objects as go
 import numpy as np
 import random
 
+from components.user_grid import grid_payload, user_grid
+from engines.bootstrap import bootstrap_matched_effect, bootstrap_naive_effect
+from engines.cem import (
+    cem_att_from_counts,
+    matched_pair_effect,
+    naive_effect_from_counts,
+    run_cem,
+)
+from engines.cem_index import StratumIndex
+from engines.matching import compare_matching_estimators
+from engines.user_store import MatchState, build_user_store, row_bitmap, store_to_frame
+
 
 def generate_user_data():
     """Hard-coded user data designed to show clear confounding effect"""
@@ -191,70 +203,41 @@ def get_matching_subset():
     return all_subset
 
 
-def create_age_bucket(age):
-    """Convert exact age to coarse bucket"""
-    if age < 30:
-        return "Young"
-    elif age < 50:
-        return "Middle-aged"
-    else:
-        return "Older"
-
-
-def create_income_bucket(income):
-    """Convert exact income to coarse bucket"""
-    if income < 40000:
-        return "Low"
-    elif income < 80000:
-        return "Medium"
-    else:
-        return "High"
-
-
-def render_stickman(user_type, user_id, selected=False):
-    """Create a simple stick figure representation"""
-    color = "red" if user_type == "premium" else "blue"
-    style = "border: 3px solid gold;" if selected else ""
-
-    return f"""
-    <div style="text-align: center; cursor: pointer; padding: 10px; {style}">
-        <div style="font-size: 40px; color: {color};">🚶</div>
-        <div style="font-size: 12px; font-weight: bold;">{user_id}</div>
-    </div>
-    """
-
-
-def calculate_naive_effect(users):
-    """Calculate naive treatment effect without matching"""
-    premium_users = [u for u in users if u["type"] == "premium"]
-    free_users = [u for u in users if u["type"] == "free"]
-
-    premium_churn_rate = sum(u["churned"] for u in premium_users) / len(premium_users)
-    free_churn_rate = sum(u["churned"] for u in free_users) / len(free_users)
-
-    return free_churn_rate - premium_churn_rate
-
-
 def find_matches(users, selected_premium_id, selected_free_id):
     """Find exact matches based on coarsened attributes"""
-    premium_user = next(u for u in users if u["id"] == selected_premium_id)
-    free_user = next(u for u in users if u["id"] == selected_free_id)
+    # Pass a StratumIndex to reuse its buckets instead of rescanning the users
+    index = users if isinstance(users, StratumIndex) else StratumIndex(users)
+    return index.compare(selected_premium_id, selected_free_id)
 
-    premium_age_bucket = create_age_bucket(premium_user["age"])
-    premium_income_bucket = create_income_bucket(premium_user["income"])
 
-    free_age_bucket = create_age_bucket(free_user["age"])
-    free_income_bucket = create_income_bucket(free_user["income"])
+@st.cache_resource
+def load_user_stores():
+    """Read-only user stores, indexes and CEM counts shared by every session"""
+    all_users = build_user_store(generate_user_data())
+    matching_users = build_user_store(get_matching_subset())
+    all_counts = run_cem(store_to_frame(all_users))["counts"]
+    matching_counts = run_cem(store_to_frame(matching_users))["counts"]
 
     return {
-        "premium_user": premium_user,
-        "free_user": free_user,
-        "age_match": premium_age_bucket == free_age_bucket,
-        "income_match": premium_income_bucket == free_income_bucket,
-        "perfect_match": premium_age_bucket == free_age_bucket
-        and premium_income_bucket == free_income_bucket,
-        "premium_buckets": (premium_age_bucket, premium_income_bucket),
-        "free_buckets": (free_age_bucket, free_income_bucket),
+        "all": all_users,
+        "matching": matching_users,
+        "matching_index": StratumIndex(matching_users),
+        "premium_bitmap": row_bitmap(
+            np.flatnonzero(matching_users["type"] == "premium")
+        ),
+        "free_bitmap": row_bitmap(np.flatnonzero(matching_users["type"] == "free")),
+        "matching_rows": {
+            user_id: row for row, user_id in enumerate(matching_users["id"].tolist())
+        },
+        "all_grid": grid_payload(all_users),
+        "matching_grid": grid_payload(matching_users),
+        "all_counts": all_counts,
+        "matching_counts": matching_counts,
+        "all_naive_ci": bootstrap_naive_effect(all_counts),
+        "matching_naive_ci": bootstrap_naive_effect(matching_counts),
+        "matching_estimators": compare_matching_estimators(
+            store_to_frame(matching_users), k=2
+        ),
     }
 
 
@@ -263,24 +246,25 @@ def render(navigate_to):
     if st.button("← Back to Home"):
         navigate_to("home")
 
+    # User data is shared read-only; sessions only keep selections and pairs
+    stores = load_user_stores()
+    index = stores["matching_index"]
+
     # Initialize session state
     if "lesson6_step" not in st.session_state:
         st.session_state.lesson6_step = 1
-        st.session_state.all_users = generate_user_data()
-        st.session_state.matching_users = get_matching_subset()
-        st.session_state.selected_premium = None
-        st.session_state.selected_free = None
-        st.session_state.matches_found = []
+        st.session_state.cem_matches = MatchState()
         st.session_state.show_naive = False
         st.session_state.show_matching = False
         st.session_state.show_buckets = False
         st.session_state.use_subset = False
 
-    users = (
-        st.session_state.matching_users
-        if st.session_state.use_subset
-        else st.session_state.all_users
-    )
+    # Sessions started before the compact store existed begin matching afresh
+    if "cem_matches" not in st.session_state:
+        st.session_state.cem_matches = MatchState()
+    matches = st.session_state.cem_matches
+
+    users = stores["matching"] if st.session_state.use_subset else stores["all"]
 
     # Step 1: Introduction
     st.title("🎯 Coarsened Exact Matching")
@@ -346,38 +330,15 @@ def render(navigate_to):
         st.header("👥 Meet Our Users")
 
         st.markdown("**Premium Users (🔴 Red) vs Free Users (🔵 Blue)**")
-        st.caption("*Click on users to see their details*")
-
-        # Display users in two columns
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.subheader("🔴 Premium Users")
-            premium_users = [u for u in users if u["type"] == "premium"]
-
-            for user in premium_users:
-                if st.button(
-                    f"🚶 {user['id']}",
-                    key=f"preview_prem_{user['id']}",
-                    help=f"Age: {user['age']}, Income: £{user['income']:,}, Churned: {'Yes' if user['churned'] else 'No'}",
-                ):
-                    st.info(
-                        f"**{user['id']}**: Age {user['age']}, Income £{user['income']:,}, {'Churned' if user['churned'] else 'Stayed'}"
-                    )
-
-        with col2:
-            st.subheader("🔵 Free Users")
-            free_users = [u for u in users if u["type"] == "free"]
-
-            for user in free_users:
-                if st.button(
-                    f"🚶 {user['id']}",
-                    key=f"preview_free_{user['id']}",
-                    help=f"Age: {user['age']}, Income: £{user['income']:,}, Churned: {'Yes' if user['churned'] else 'No'}",
-                ):
-                    st.info(
-                        f"**{user['id']}**: Age {user['age']}, Income £{user['income']:,}, {'Churned' if user['churned'] else 'Stayed'}"
-                    )
+        st.caption("*Scroll through the users to see their details*")
+
+        # One virtualised grid lists everyone, however many users there are
+        user_grid(
+            stores["matching_grid" if st.session_state.use_subset else "all_grid"],
+            selectable=False,
+            height=320,
+            key="cem_preview_grid",
+        )
 
     if st.session_state.lesson6_step >= 6:
         st.header("📊 Naive Analysis")
@@ -387,14 +348,13 @@ def render(navigate_to):
             st.rerun()
 
         if st.session_state.show_naive:
-            naive_effect = calculate_naive_effect(users)
+            subset = "matching" if st.session_state.use_subset else "all"
+            counts = stores[f"{subset}_counts"]
+            naive_effect = naive_effect_from_counts(counts)
+            naive_low, naive_high = stores[f"{subset}_naive_ci"]
 
-            premium_churn = sum(
-                u["churned"] for u in users if u["type"] == "premium"
-            ) / len([u for u in users if u["type"] == "premium"])
-            free_churn = sum(u["churned"] for u in users if u["type"] == "free") / len(
-                [u for u in users if u["type"] == "free"]
-            )
+            premium_churn = counts["churn_treated"].sum() / counts["n_treated"].sum()
+            free_churn = counts["churn_control"].sum() / counts["n_control"].sum()
 
             col1, col2, col3 = st.columns(3)
             with col1:
@@ -407,6 +367,7 @@ def render(navigate_to):
                     f"{naive_effect:.1%}",
                     help="Free churn rate - Premium churn rate",
                 )
+                st.caption(f"95% bootstrap CI: {naive_low:.1%} to {naive_high:.1%}")
 
             st.success(
                 "🎉 Wow! Premium users churn much less! The premium feature must be amazing!"
@@ -492,101 +453,32 @@ def render(navigate_to):
         # Switch to the matching subset (5 premium + 8 free users with guaranteed matches)
         if not st.session_state.use_subset:
             st.session_state.use_subset = True
-            users = st.session_state.matching_users
-
-        # Display users in two columns with bucket info if bucketing is shown
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.subheader("🔴 Premium Users")
-            premium_users = [u for u in users if u["type"] == "premium"]
-
-            for i, user in enumerate(premium_users):
-                # Check if this user is already matched
-                already_matched = any(
-                    match["premium_user"]["id"] == user["id"]
-                    for match in st.session_state.matches_found
-                )
-
-                if not already_matched:
-                    selected = st.session_state.selected_premium == user["id"]
-
-                    if st.session_state.show_buckets:
-                        age_bucket = create_age_bucket(user["age"])
-                        income_bucket = create_income_bucket(user["income"])
-                        button_text = f"🚶 {user['id']}"
-                        help_text = f"{age_bucket}, {income_bucket}, Churned: {'Yes' if user['churned'] else 'No'}"
-                    else:
-                        button_text = f"🚶 {user['id']}"
-                        help_text = f"Age: {user['age']}, Income: £{user['income']:,}, Churned: {'Yes' if user['churned'] else 'No'}"
-
-                    if st.button(
-                        button_text, key=f"match_prem_{user['id']}", help=help_text
-                    ):
-                        st.session_state.selected_premium = user["id"]
-                        st.rerun()
-
-                    if selected:
-                        st.markdown("**🟡 SELECTED**")
-                        if st.session_state.show_buckets:
-                            st.caption(f"Age: {create_age_bucket(user['age'])}")
-                            st.caption(
-                                f"Income: {create_income_bucket(user['income'])}"
-                            )
-                        else:
-                            st.caption(f"Age: {user['age']}")
-                            st.caption(f"Income: £{user['income']:,}")
-                        st.caption(f"Churned: {'Yes' if user['churned'] else 'No'}")
-                else:
-                    st.success(f"✅ {user['id']} - Already Matched")
-
-        with col2:
-            st.subheader("🔵 Free Users")
-            free_users = [u for u in users if u["type"] == "free"]
-
-            for i, user in enumerate(free_users):
-                # Check if this user is already matched
-                already_matched = any(
-                    match["free_user"]["id"] == user["id"]
-                    for match in st.session_state.matches_found
-                )
+            users = stores["matching"]
+
+        # Every user goes to one virtualised grid instead of a button each
+        pick = user_grid(
+            stores["matching_grid"],
+            matched_rows=[row for pair in matches.pairs for row in pair],
+            selected_premium=matches.selected_row(stores["premium_bitmap"]),
+            selected_free=matches.selected_row(stores["free_bitmap"]),
+            show_buckets=st.session_state.show_buckets,
+            key="cem_user_grid",
+        )
 
-                if not already_matched:
-                    selected = st.session_state.selected_free == user["id"]
-
-                    if st.session_state.show_buckets:
-                        age_bucket = create_age_bucket(user["age"])
-                        income_bucket = create_income_bucket(user["income"])
-                        button_text = f"🚶 {user['id']}"
-                        help_text = f"{age_bucket}, {income_bucket}, Churned: {'Yes' if user['churned'] else 'No'}"
-                    else:
-                        button_text = f"🚶 {user['id']}"
-                        help_text = f"Age: {user['age']}, Income: £{user['income']:,}, Churned: {'Yes' if user['churned'] else 'No'}"
-
-                    if st.button(
-                        button_text, key=f"match_free_{user['id']}", help=help_text
-                    ):
-                        st.session_state.selected_free = user["id"]
-                        st.rerun()
-
-                    if selected:
-                        st.markdown("**🟡 SELECTED**")
-                        if st.session_state.show_buckets:
-                            st.caption(f"Age: {create_age_bucket(user['age'])}")
-                            st.caption(
-                                f"Income: {create_income_bucket(user['income'])}"
-                            )
-                        else:
-                            st.caption(f"Age: {user['age']}")
-                            st.caption(f"Income: £{user['income']:,}")
-                        st.caption(f"Churned: {'Yes' if user['churned'] else 'No'}")
-                else:
-                    st.success(f"✅ {user['id']} - Already Matched")
+        # The grid keeps returning its last pick, so apply each one once
+        if pick and pick["nonce"] != st.session_state.get("cem_grid_nonce"):
+            st.session_state.cem_grid_nonce = pick["nonce"]
+            matches.select(
+                stores["matching_rows"][pick["premium"]], stores["premium_bitmap"]
+            )
+            matches.select(stores["matching_rows"][pick["free"]], stores["free_bitmap"])
 
         # Show comparison if both users selected
-        if st.session_state.selected_premium and st.session_state.selected_free:
+        premium_row = matches.selected_row(stores["premium_bitmap"])
+        free_row = matches.selected_row(stores["free_bitmap"])
+        if premium_row is not None and free_row is not None:
             match_result = find_matches(
-                users, st.session_state.selected_premium, st.session_state.selected_free
+                index, users[premium_row]["id"], users[free_row]["id"]
             )
 
             st.subheader("🔍 Comparison Results")
@@ -631,11 +523,9 @@ def render(navigate_to):
                     "✅ **Perfect Match!** Both users are in the same age and income buckets."
                 )
                 if st.button("💾 Save This Match"):
-                    st.session_state.matches_found.append(match_result)
-                    st.session_state.selected_premium = None
-                    st.session_state.selected_free = None
+                    matches.save_pair(premium_row, free_row)
                     st.success(
-                        f"Match saved! You now have {len(st.session_state.matches_found)} matches."
+                        f"Match saved! You now have {len(matches.pairs)} matches."
                     )
                     st.rerun()
             else:
@@ -650,10 +540,13 @@ def render(navigate_to):
                 )
 
         # Show matched pairs table
-        if len(st.session_state.matches_found) > 0:
+        if len(matches.pairs) > 0:
             st.subheader("📋 Matched Pairs")
 
-            for i, match in enumerate(st.session_state.matches_found):
+            for premium_row, free_row in matches.pairs:
+                match = find_matches(
+                    index, users[premium_row]["id"], users[free_row]["id"]
+                )
                 col1, col2, col3 = st.columns([1, 1, 1])
                 with col1:
                     premium_status = (
@@ -676,17 +569,10 @@ def render(navigate_to):
                     st.info(f"**{match['free_user']['id']}** (Free)\n{free_status}")
 
         # Check if all premium users are matched
-        premium_users = [u for u in users if u["type"] == "premium"]
-        unmatched_premium = [
-            u
-            for u in premium_users
-            if not any(
-                match["premium_user"]["id"] == u["id"]
-                for match in st.session_state.matches_found
-            )
-        ]
+        n_premium = stores["premium_bitmap"].bit_count()
+        n_unmatched_premium = matches.n_unmatched(stores["premium_bitmap"])
 
-        if len(unmatched_premium) == 0 and len(st.session_state.matches_found) > 0:
+        if n_unmatched_premium == 0 and len(matches.pairs) > 0:
             if st.button(
                 "🎉 Calculate Average Treatment Effect - All Premiums Matched!",
                 type="primary",
@@ -695,27 +581,34 @@ def render(navigate_to):
                 st.rerun()
         else:
             st.info(
-                f"🎯 **Progress**: {len(st.session_state.matches_found)}/{len(premium_users)} premium users matched. Match all premium users to unlock the final calculation!"
+                f"🎯 **Progress**: {len(matches.pairs)}/{n_premium} premium users matched. Match all premium users to unlock the final calculation!"
             )
 
-    if st.session_state.lesson6_step >= 10 and len(st.session_state.matches_found) > 0:
+    if st.session_state.lesson6_step >= 10 and len(matches.pairs) > 0:
         st.header("🎉 Final Results: Matched Analysis")
 
         st.markdown(
-            f"**Congratulations! You matched all {len(st.session_state.matches_found)} premium users!**"
+            f"**Congratulations! You matched all {len(matches.pairs)} premium users!**"
         )
 
         # Calculate effect from matches
-        matched_premium_churn = sum(
-            match["premium_user"]["churned"] for match in st.session_state.matches_found
-        ) / len(st.session_state.matches_found)
-        matched_free_churn = sum(
-            match["free_user"]["churned"] for match in st.session_state.matches_found
-        ) / len(st.session_state.matches_found)
-        matched_effect = matched_free_churn - matched_premium_churn
+        matched_users = stores["matching"]
+        premium_rows, free_rows = np.array(matches.pairs).T
+        matched_premium_churn = matched_users["churned"][premium_rows].mean()
+        matched_free_churn = matched_users["churned"][free_rows].mean()
+        matched_effect = matched_pair_effect(
+            matched_users["churned"], premium_rows, free_rows
+        )
+        matched_low, matched_high = bootstrap_matched_effect(
+            matched_users["churned"], premium_rows, free_rows
+        )
 
         # Calculate naive effect from original large dataset
-        naive_effect = calculate_naive_effect(st.session_state.all_users)
+        naive_effect = naive_effect_from_counts(stores["all_counts"])
+        naive_low, naive_high = stores["all_naive_ci"]
+
+        # CEM-weighted ATT over every stratum of the matching subset
+        cem_att = cem_att_from_counts(stores["matching_counts"])
 
         st.subheader("📊 Compare the Results")
 
@@ -727,6 +620,7 @@ def render(navigate_to):
                 f"{naive_effect:.1%}",
                 help="From original large dataset - biased by confounders",
             )
+            st.caption(f"95% bootstrap CI: {naive_low:.1%} to {naive_high:.1%}")
             st.caption("Used ALL users without controlling for age/income")
 
         with col2:
@@ -735,6 +629,7 @@ def render(navigate_to):
                 f"{matched_effect:.1%}",
                 help="From matched pairs - controlling for age & income",
             )
+            st.caption(f"95% bootstrap CI: {matched_low:.1%} to {matched_high:.1%}")
             st.caption("Used only matched pairs with same age/income buckets")
 
         # Show insight based on difference
@@ -756,7 +651,12 @@ def render(navigate_to):
         # Show detailed breakdown
         with st.expander("🔍 See Detailed Breakdown"):
             st.markdown("**Your Matched Pairs:**")
-            for i, match in enumerate(st.session_state.matches_found, 1):
+            for i, (premium_row, free_row) in enumerate(matches.pairs, 1):
+                match = find_matches(
+                    index,
+                    matched_users[premium_row]["id"],
+                    matched_users[free_row]["id"],
+                )
                 premium_result = (
                     "Churned" if match["premium_user"]["churned"] else "Stayed"
                 )
@@ -774,6 +674,31 @@ def render(navigate_to):
             st.write(
                 f"- Treatment effect: {matched_free_churn:.1%} - {matched_premium_churn:.1%} = **{matched_effect:.1%}**"
             )
+            st.write(
+                f"- CEM-weighted effect using every user in each stratum: **{cem_att:.1%}**"
+            )
+
+        with st.expander("⚖️ Compare Other Matching Methods"):
+            st.markdown(
+                "The same users matched three ways: exact strata, the 2 most similar "
+                "free users within each stratum, and the single most similar free "
+                "user on standardised age and income."
+            )
+            estimators = stores["matching_estimators"]
+            st.dataframe(
+                estimators.rename(
+                    columns={
+                        "estimator": "Method",
+                        "att": "Effect",
+                        "n_matched_treated": "Premium matched",
+                        "n_unmatched_treated": "Premium unmatched",
+                        "n_unmatched_control": "Free unmatched",
+                        "seconds": "Time (s)",
+                    }
+                ).style.format({"Effect": "{:.1%}", "Time (s)": "{:.4f}"}),
+                hide_index=True,
+                use_container_width=True,
+            )
 
     if st.session_state.lesson6_step >= 11:
         st.header("🎓 Key Takeaways")
@@ -811,11 +736,7 @@ def render(navigate_to):
         with col1:
             if st.button("🔄 Start Over", use_container_width=True):
                 st.session_state.lesson6_step = 1
-                st.session_state.all_users = generate_user_data()
-                st.session_state.matching_users = get_matching_subset()
-                st.session_state.selected_premium = None
-                st.session_state.selected_free = None
-                st.session_state.matches_found = []
+                st.session_state.cem_matches = MatchState()
                 st.session_state.show_naive = False
                 st.session_state.show_matching = False
                 st.session_state.show_buckets = False
@@ -2,18 +2,71 @@ import streamlit as st
 import plotly.graph_objects as go
 import numpy as np
 import pandas as pd
-
-
-def generate_classroom_data(n_students=500):
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from engines.confounding_sim import (
+    TRUE_HOURS_EFFECT,
+    simulate_naive_slopes,
+    summarize_slopes,
+)
+from engines.density import density_tiles
+from engines.iv import ordinary_least_squares, two_stage_least_squares
+from engines.online_regression import OnlineRegression
+from engines.regression_adjustment import RegressionAdjuster
+
+# Above these class sizes plots switch to WebGL, then to binned density tiles
+WEBGL_THRESHOLD = 5_000
+DENSITY_THRESHOLD = 100_000
+COHORT_SIZES = [
+    100,
+    200,
+    500,
+    1_000,
+    2_000,
+    5_000,
+    10_000,
+    20_000,
+    50_000,
+    100_000,
+    200_000,
+    500_000,
+    1_000_000,
+    2_000_000,
+    5_000_000,
+]
+# Larger classes are built in the background behind a preview of this size
+PREVIEW_SIZE = 50_000
+# Class sizes each shared cache keeps; a 5M-student class holds 200 MB+
+CACHED_COHORTS = 4
+HOURS_RANGE = (5.0, 45.0)  # Bounds the generators clip classroom hours to
+GRADE_RANGE = (0.0, 100.0)
+
+# Measured confounders the regression-adjustment view can control for
+ADJUSTMENT_COVARIATES = {
+    "motivation": "💪 Motivation",
+    "family_support": "🏠 Family support",
+    "teacher_quality": "👩‍🏫 Teacher quality",
+}
+
+# Grid for the Monte Carlo explorer: 50 strengths x 50 class sizes
+SWEEP_STRENGTHS = np.linspace(0, 2, 50)
+SWEEP_SAMPLE_SIZES = np.geomspace(20, 5_000, 50).astype(int)
+
+# One template formats every point in the browser from its own x/y values
+POINT_HOVER = "Hours: %{x:.1f}<br>Grade: %{y:.1f}<extra></extra>"
+
+
+def generate_classroom_data(n_students=500, seed=42):
     """Generate classroom hours vs grades data with confounders"""
-    np.random.seed(42)
+    # Own generator, so concurrent sessions never share the global RNG state
+    rng = np.random.default_rng(seed)
 
     # Generate confounders
-    motivation = np.random.normal(50, 15, n_students)  # 0-100 scale
-    teacher_quality = np.random.choice(
-        [30, 50, 70, 90], n_students
-    )  # Different teachers
-    family_support = np.random.normal(60, 20, n_students)  # 0-100 scale
+    motivation = rng.normal(50, 15, n_students)  # 0-100 scale
+    teacher_quality = rng.choice([30, 50, 70, 90], n_students)  # Different teachers
+    family_support = rng.normal(60, 20, n_students)  # 0-100 scale
 
     # Motivation affects both class attendance AND grades
     # Family support affects both class attendance AND grades
@@ -30,7 +83,7 @@ def generate_classroom_data(n_students=500):
         + hours_from_motivation
         + hours_from_family
         + hours_from_teacher
-        + np.random.normal(0, 3, n_students)
+        + rng.normal(0, 3, n_students)
     )
     classroom_hours = np.clip(classroom_hours, 5, 40)  # Reasonable bounds
 
@@ -49,7 +102,7 @@ def generate_classroom_data(n_students=500):
         + grade_from_family
         + grade_from_teacher
         + grade_from_hours
-        + np.random.normal(0, 5, n_students)
+        + rng.normal(0, 5, n_students)
     )
     grades = np.clip(grades, 0, 100)
 
@@ -64,14 +117,14 @@ def generate_classroom_data(n_students=500):
     )
 
 
-def generate_treated_data(n_students=500):
+def generate_treated_data(n_students=500, seed=43):
     """Generate data for students affected by the new school rule"""
-    np.random.seed(43)  # Different seed for variation
+    rng = np.random.default_rng(seed)  # Different seed for variation
 
     # Same confounders as before
-    motivation = np.random.normal(50, 15, n_students)
-    teacher_quality = np.random.choice([30, 50, 70, 90], n_students)
-    family_support = np.random.normal(60, 20, n_students)
+    motivation = rng.normal(50, 15, n_students)
+    teacher_quality = rng.choice([30, 50, 70, 90], n_students)
+    family_support = rng.normal(60, 20, n_students)
 
     # The rule FORCES extra hours, independent of motivation/family
     base_hours = 15
@@ -80,7 +133,7 @@ def generate_treated_data(n_students=500):
     hours_from_teacher = (teacher_quality - 50) * 0.1  # Same relationship
 
     # NEW: Add forced extra hours from the rule (independent of confounders)
-    forced_extra_hours = np.random.uniform(3, 8, n_students)  # Rule adds 3-8 hours
+    forced_extra_hours = rng.uniform(3, 8, n_students)  # Rule adds 3-8 hours
 
     classroom_hours = (
         base_hours
@@ -88,7 +141,7 @@ def generate_treated_data(n_students=500):
         + hours_from_family
         + hours_from_teacher
         + forced_extra_hours
-        + np.random.normal(0, 2, n_students)
+        + rng.normal(0, 2, n_students)
     )
     classroom_hours = np.clip(classroom_hours, 5, 45)
 
@@ -107,7 +160,7 @@ def generate_treated_data(n_students=500):
         + grade_from_family
         + grade_from_teacher
         + grade_from_hours
-        + np.random.normal(0, 5, n_students)
+        + rng.normal(0, 5, n_students)
     )
     grades = np.clip(grades, 0, 100)
 
@@ -123,49 +176,229 @@ def generate_treated_data(n_students=500):
     )
 
 
-def create_scatter_plot(data, show_confounders=False):
+@st.cache_resource(show_spinner=False, max_entries=CACHED_COHORTS)
+def load_classroom_data(n_students=500, seed=42):
+    """Classroom data shared by every session, built once per (n_students, seed)"""
+    return generate_classroom_data(n_students, seed)
+
+
+@st.cache_resource(show_spinner=False, max_entries=CACHED_COHORTS)
+def load_treated_data(n_students=500, seed=43):
+    """Rule-affected data shared by every session, built once per (n_students, seed)"""
+    return generate_treated_data(n_students, seed)
+
+
+def fit_grade_trend(data):
+    """Running regression statistics of grades on classroom hours"""
+    return OnlineRegression(data["classroom_hours"], data["grades"])
+
+
+@st.cache_resource(show_spinner=False, max_entries=CACHED_COHORTS)
+def load_classroom_trend(n_students=500, seed=42):
+    """Trend statistics of the shared classroom data; copy before updating"""
+    return fit_grade_trend(load_classroom_data(n_students, seed))
+
+
+@st.cache_resource(show_spinner=False, max_entries=CACHED_COHORTS)
+def load_treated_trend(n_students=500, seed=43):
+    """Trend statistics of the shared rule-affected data; copy before updating"""
+    return fit_grade_trend(load_treated_data(n_students, seed))
+
+
+@st.cache_resource
+def cohort_builds():
+    """Background builds of large classes, shared by every session
+
+    futures is ordered oldest first; finished builds beyond CACHED_COHORTS
+    are dropped so their data can be freed.
+    """
+    return {
+        "executor": ThreadPoolExecutor(max_workers=1),
+        "futures": OrderedDict(),
+        "lock": threading.Lock(),
+    }
+
+
+def build_cohort(n_students):
+    """Everything the lesson shows for a class size, through the shared caches"""
+    return {
+        "data": load_classroom_data(n_students),
+        "trend": load_classroom_trend(n_students),
+        "treated": load_treated_data(n_students),
+        "treated_trend": load_treated_trend(n_students),
+        "iv": load_iv_estimates(n_students),
+        "adjuster": load_regression_adjuster(n_students),
+    }
+
+
+def classroom_cohort(n_students):
+    """Lesson data and fits for a class size, plus any pending build
+
+    Small classes are built inline. Larger ones are queued once on a
+    background thread; until that finishes, a PREVIEW_SIZE class from the
+    same distribution stands in for every section with provisional
+    statistics, and the returned future is not None.
+    """
+    if n_students <= PREVIEW_SIZE:
+        return build_cohort(n_students), None
+
+    builds = cohort_builds()
+    with builds["lock"]:
+        futures = builds["futures"]
+        future = futures.get(n_students)
+        if future is None:
+            future = builds["executor"].submit(build_cohort, n_students)
+            futures[n_students] = future
+            finished = [size for size, build in futures.items() if build.done()]
+            for size in finished[: max(len(futures) - CACHED_COHORTS, 0)]:
+                del futures[size]
+        futures.move_to_end(n_students)
+
+    if future.done():
+        return future.result(), None
+    return build_cohort(PREVIEW_SIZE), future
+
+
+@st.fragment(run_every=0.5)
+def refresh_when_ready(future):
+    """Poll a background build and rerun the page once it has finished"""
+    if future.done():
+        st.rerun()
+
+
+@st.cache_resource(show_spinner=False, max_entries=CACHED_COHORTS)
+def load_iv_estimates(n_students=500):
+    """Naive OLS and 2SLS hours effects on the shared data, fitted once"""
+    naive = ordinary_least_squares(
+        load_classroom_data(n_students), "grades", ["classroom_hours"]
+    )
+    # Within the rule group, the forced hours vary independently of confounders
+    iv = two_stage_least_squares(
+        load_treated_data(n_students),
+        "grades",
+        ["classroom_hours"],
+        instruments=["forced_extra_hours"],
+    )
+    return {"naive": naive, "iv": iv}
+
+
+@st.cache_resource(show_spinner=False, max_entries=CACHED_COHORTS)
+def load_regression_adjuster(n_students=500):
+    """QR factorisation of the full adjustment design, computed once"""
+    return RegressionAdjuster(
+        load_classroom_data(n_students),
+        "grades",
+        "classroom_hours",
+        list(ADJUSTMENT_COVARIATES),
+    )
+
+
+def session_adjuster(adjuster, n_students):
+    """This session's covariate selection on top of the shared factorisation"""
+    if st.session_state.get("lesson3_adjuster_students") != n_students:
+        st.session_state.lesson3_adjuster = adjuster.copy()
+        st.session_state.lesson3_adjuster_students = n_students
+    return st.session_state.lesson3_adjuster
+
+
+@st.cache_resource
+def load_confounding_sweep(n_reps=1_000, seed=0):
+    """Simulated naive slopes over the whole explorer grid, run once"""
+    slopes = simulate_naive_slopes(
+        SWEEP_STRENGTHS, SWEEP_SAMPLE_SIZES, n_reps=n_reps, seed=seed
+    )
+    return {"slopes": slopes, **summarize_slopes(slopes)}
+
+
+def scatter_trace(n_points, **kwargs):
+    """SVG scatter for small classes, WebGL once there are too many points"""
+    if n_points > WEBGL_THRESHOLD:
+        return go.Scattergl(**kwargs)
+    return go.Scatter(**kwargs)
+
+
+def add_trend_line(fig, data, color, name, showlegend=True, trend=None):
+    """Add a least-squares trend line of grades on classroom hours"""
+    if trend is None:
+        trend = fit_grade_trend(data)
+    # The fit tracks the hours range, so the line needs no pass over the data
+    x_trend = np.linspace(trend.min_x, trend.max_x, 100)
+    fig.add_trace(
+        go.Scatter(
+            x=x_trend,
+            y=trend.predict(x_trend),
+            mode="lines",
+            line=dict(color=color, width=2),
+            name=name,
+            showlegend=showlegend,
+        )
+    )
+
+
+def create_scatter_plot(
+    data, show_confounders=False, x_range=None, y_range=None, trend=None
+):
     """Create scatter plot of classroom hours vs grades"""
     fig = go.Figure()
 
-    if not show_confounders:
+    if len(data) > DENSITY_THRESHOLD:
+        # Too many points to draw: bin the visible range into density tiles
+        tiles = density_tiles(
+            data["classroom_hours"],
+            data["grades"],
+            data["motivation"] if show_confounders else None,
+            x_range=x_range,
+            y_range=y_range,
+        )
+        counts = tiles["counts"]
+        if show_confounders:
+            z = tiles["mean"]
+            colorscale = "RdYlBu_r"
+            colorbar_title = "Mean Motivation"
+        else:
+            z = np.where(counts > 0, counts, np.nan)
+            colorscale = "Blues"
+            colorbar_title = "Students"
+
+        fig.add_trace(
+            go.Heatmap(
+                x=tiles["x"],
+                y=tiles["y"],
+                z=z,
+                customdata=counts,
+                colorscale=colorscale,
+                colorbar=dict(title=colorbar_title),
+                name="Students",
+                hovertemplate="Hours: %{x:.1f}<br>Grade: %{y:.1f}<br>"
+                "Students: %{customdata}<extra></extra>",
+            )
+        )
+
+        if not show_confounders:
+            add_trend_line(fig, data, "red", "Trend Line", trend=trend)
+
+    elif not show_confounders:
         # Simple scatter plot
         fig.add_trace(
-            go.Scatter(
+            scatter_trace(
+                len(data),
                 x=data["classroom_hours"],
                 y=data["grades"],
                 mode="markers",
                 marker=dict(color="blue", size=6, opacity=0.6),
                 name="Students",
-                text=[
-                    f"Hours: {h:.1f}<br>Grade: {g:.1f}"
-                    for h, g in zip(data["classroom_hours"], data["grades"])
-                ],
-                hovertemplate="%{text}<extra></extra>",
+                hovertemplate=POINT_HOVER,
             )
         )
 
         # Add trendline
-        z = np.polyfit(data["classroom_hours"], data["grades"], 1)
-        p = np.poly1d(z)
-        x_trend = np.linspace(
-            data["classroom_hours"].min(), data["classroom_hours"].max(), 100
-        )
-        fig.add_trace(
-            go.Scatter(
-                x=x_trend,
-                y=p(x_trend),
-                mode="lines",
-                line=dict(color="red", width=2),
-                name="Trend Line",
-            )
-        )
-
-        title = "Classroom Hours vs Grades - Strong Positive Correlation!"
+        add_trend_line(fig, data, "red", "Trend Line", trend=trend)
 
     else:
         # Color by motivation level
         fig.add_trace(
-            go.Scatter(
+            scatter_trace(
+                len(data),
                 x=data["classroom_hours"],
                 y=data["grades"],
                 mode="markers",
@@ -177,17 +410,16 @@ def create_scatter_plot(data, show_confounders=False):
                     colorbar=dict(title="Motivation Level"),
                 ),
                 name="Students",
-                text=[
-                    f"Hours: {h:.1f}<br>Grade: {g:.1f}<br>Motivation: {m:.1f}"
-                    for h, g, m in zip(
-                        data["classroom_hours"], data["grades"], data["motivation"]
-                    )
-                ],
-                hovertemplate="%{text}<extra></extra>",
+                customdata=data["motivation"],
+                hovertemplate="Hours: %{x:.1f}<br>Grade: %{y:.1f}<br>"
+                "Motivation: %{customdata:.1f}<extra></extra>",
             )
         )
 
+    if show_confounders:
         title = "Same Data, Colored by Motivation - See the Confounder!"
+    else:
+        title = "Classroom Hours vs Grades - Strong Positive Correlation!"
 
     fig.update_layout(
         title=title,
@@ -197,85 +429,87 @@ def create_scatter_plot(data, show_confounders=False):
         height=500,
         showlegend=False,
     )
+    if x_range:
+        fig.update_xaxes(range=x_range)
+    if y_range:
+        fig.update_yaxes(range=y_range)
 
     return fig
 
 
-def create_instrumental_comparison_plot(original_data, treated_data):
+def create_instrumental_comparison_plot(
+    original_data,
+    treated_data,
+    x_range=None,
+    y_range=None,
+    original_trend=None,
+    treated_trend=None,
+):
     """Create comparison plot showing original vs treated groups"""
     fig = go.Figure()
-
-    # Original group (red)
-    fig.add_trace(
-        go.Scatter(
-            x=original_data["classroom_hours"],
-            y=original_data["grades"],
-            mode="markers",
-            marker=dict(color="red", size=6, opacity=0.6),
-            name="Original Group (Before Rule)",
-            text=[
-                f"Hours: {h:.1f}<br>Grade: {g:.1f}"
-                for h, g in zip(
-                    original_data["classroom_hours"], original_data["grades"]
+    groups = [
+        (original_data, "red", "Original Group (Before Rule)"),
+        (treated_data, "blue", "Treated Group (After Rule)"),
+    ]
+
+    if max(len(original_data), len(treated_data)) > DENSITY_THRESHOLD:
+        # Density contours per group, binned on a shared visible range
+        x_range = x_range or HOURS_RANGE
+        y_range = y_range or GRADE_RANGE
+        for data, color, name in groups:
+            tiles = density_tiles(
+                data["classroom_hours"],
+                data["grades"],
+                x_range=x_range,
+                y_range=y_range,
+            )
+            fig.add_trace(
+                go.Contour(
+                    x=tiles["x"],
+                    y=tiles["y"],
+                    z=tiles["counts"],
+                    contours=dict(coloring="lines"),
+                    colorscale=[[0, color], [1, color]],
+                    showscale=False,
+                    name=name,
+                    showlegend=True,
+                    hovertemplate="Hours: %{x:.1f}<br>Grade: %{y:.1f}<br>"
+                    "Students: %{z}<extra></extra>",
                 )
-            ],
-            hovertemplate="%{text}<extra></extra>",
-        )
-    )
-
-    # Treated group (blue)
-    fig.add_trace(
-        go.Scatter(
-            x=treated_data["classroom_hours"],
-            y=treated_data["grades"],
-            mode="markers",
-            marker=dict(color="blue", size=6, opacity=0.6),
-            name="Treated Group (After Rule)",
-            text=[
-                f"Hours: {h:.1f}<br>Grade: {g:.1f}"
-                for h, g in zip(treated_data["classroom_hours"], treated_data["grades"])
-            ],
-            hovertemplate="%{text}<extra></extra>",
-        )
-    )
+            )
+    else:
+        for data, color, name in groups:
+            fig.add_trace(
+                scatter_trace(
+                    len(data),
+                    x=data["classroom_hours"],
+                    y=data["grades"],
+                    mode="markers",
+                    marker=dict(color=color, size=6, opacity=0.6),
+                    name=name,
+                    hovertemplate=POINT_HOVER,
+                )
+            )
 
     # Add trendlines
     # Original group trendline (steeper - confounded)
-    z1 = np.polyfit(original_data["classroom_hours"], original_data["grades"], 1)
-    p1 = np.poly1d(z1)
-    x_trend1 = np.linspace(
-        original_data["classroom_hours"].min(),
-        original_data["classroom_hours"].max(),
-        100,
-    )
-    fig.add_trace(
-        go.Scatter(
-            x=x_trend1,
-            y=p1(x_trend1),
-            mode="lines",
-            line=dict(color="darkred", width=2),
-            name="Original Trend (Confounded)",
-            showlegend=False,
-        )
+    add_trend_line(
+        fig,
+        original_data,
+        "darkred",
+        "Original Trend (Confounded)",
+        showlegend=False,
+        trend=original_trend,
     )
 
     # Treated group trendline (less steep - true causal effect)
-    z2 = np.polyfit(treated_data["classroom_hours"], treated_data["grades"], 1)
-    p2 = np.poly1d(z2)
-    x_trend2 = np.linspace(
-        treated_data["classroom_hours"].min(),
-        treated_data["classroom_hours"].max(),
-        100,
-    )
-    fig.add_trace(
-        go.Scatter(
-            x=x_trend2,
-            y=p2(x_trend2),
-            mode="lines",
-            line=dict(color="darkblue", width=2),
-            name="Treated Trend (True Causal Effect)",
-            showlegend=False,
-        )
+    add_trend_line(
+        fig,
+        treated_data,
+        "darkblue",
+        "Treated Trend (True Causal Effect)",
+        showlegend=False,
+        trend=treated_trend,
     )
 
     fig.update_layout(
@@ -286,10 +520,96 @@ def create_instrumental_comparison_plot(original_data, treated_data):
         height=500,
         showlegend=True,
     )
+    if x_range:
+        fig.update_xaxes(range=x_range)
+    if y_range:
+        fig.update_yaxes(range=y_range)
 
     return fig
 
 
+def create_bias_heatmap(sweep):
+    """Heatmap of the naive slope's bias over strength and class size"""
+    fig = go.Figure(
+        go.Heatmap(
+            x=SWEEP_STRENGTHS,
+            y=SWEEP_SAMPLE_SIZES,
+            z=sweep["bias"],
+            customdata=sweep["std"],
+            colorscale="Reds",
+            colorbar=dict(title="Bias"),
+            hovertemplate="Strength: %{x:.2f}<br>Students: %{y:,}<br>"
+            "Bias: %{z:.2f}<br>Spread: %{customdata:.2f}<extra></extra>",
+        )
+    )
+    fig.update_layout(
+        title="How Far the Naive Slope Lands from the True Effect",
+        xaxis_title="Confounding Strength (1 = our classroom)",
+        yaxis_title="Students per Class",
+        yaxis_type="log",
+        width=700,
+        height=500,
+    )
+    return fig
+
+
+def create_slope_histogram(slopes, hours_effect=TRUE_HOURS_EFFECT):
+    """Distribution of simulated naive slopes against the true effect"""
+    fig = go.Figure(
+        go.Histogram(
+            x=slopes,
+            nbinsx=50,
+            marker=dict(color="blue", opacity=0.6),
+            name="Naive slopes",
+        )
+    )
+    fig.add_vline(
+        x=hours_effect,
+        line=dict(color="green", width=3, dash="dash"),
+        annotation_text="True effect",
+    )
+    fig.add_vline(
+        x=slopes.mean(),
+        line=dict(color="red", width=2),
+        annotation_text="Average naive slope",
+        annotation_position="top left",
+    )
+    fig.update_layout(
+        title="Naive Slopes Across Simulated Classes",
+        xaxis_title="Naive Slope (grade points per hour)",
+        yaxis_title="Simulated Classes",
+        width=700,
+        height=400,
+        showlegend=False,
+    )
+    return fig
+
+
+def zoom_controls(data, key):
+    """Hours and grade range sliders; the density view re-bins what they show"""
+    if len(data) <= DENSITY_THRESHOLD:
+        return None, None
+
+    col1, col2 = st.columns(2)
+    with col1:
+        x_range = st.slider(
+            "🔍 Zoom: weekly classroom hours",
+            *HOURS_RANGE,
+            HOURS_RANGE,
+            step=0.5,
+            key=f"{key}_hours",
+        )
+    with col2:
+        y_range = st.slider(
+            "🔍 Zoom: final grade (%)",
+            *GRADE_RANGE,
+            GRADE_RANGE,
+            step=1.0,
+            key=f"{key}_grades",
+        )
+    return x_range, y_range
+
+
 def render(navigate_to):
     # Back button
     if st.button("← Back to Home"):
@@ -325,19 +645,44 @@ def render(navigate_to):
         st.info("**If students spend more hours in class, do their grades improve?**")
 
         # Generate and show the data
-        data = generate_classroom_data()
+        requested_students = st.select_slider(
+            "👥 Number of students",
+            options=COHORT_SIZES,
+            value=500,
+            format_func=lambda n: f"{n:,}",
+            key="lesson3_cohort",
+        )
+        cohort, pending = classroom_cohort(requested_students)
+        data, trend = cohort["data"], cohort["trend"]
+        if pending is not None:
+            st.caption(
+                f"⏳ Generating all {requested_students:,} students... showing a "
+                f"{len(data):,}-student preview with provisional statistics until they're ready."
+            )
+            refresh_when_ready(pending)
+
+        # Later sections use the class actually on screen, never a fresh build
+        n_students = len(data)
 
         st.markdown(
             "At first glance, if we plot classroom hours against grades, it might look like a nice upward-sloping line — more hours, better grades."
         )
 
-        fig = create_scatter_plot(data, show_confounders=False)
+        x_range, y_range = zoom_controls(data, "lesson3_scatter_zoom")
+        fig = create_scatter_plot(
+            data,
+            show_confounders=False,
+            x_range=x_range,
+            y_range=y_range,
+            trend=trend,
+        )
         st.plotly_chart(fig, use_container_width=True)
 
-        # Calculate correlation
-        correlation = np.corrcoef(data["classroom_hours"], data["grades"])[0, 1]
+        # Correlation straight from the cached trend statistics
+        correlation = trend.r
+        provisional = " (provisional)" if pending is not None else ""
         st.success(
-            f"📈 **Strong positive correlation: {correlation:.3f}** - More hours, better grades!"
+            f"📈 **Strong positive correlation{provisional}: {correlation:.3f}** - More hours, better grades!"
         )
 
     # Step 3: But Is That The Full Story?
@@ -357,6 +702,24 @@ def render(navigate_to):
         """
         )
 
+        if st.button("🎨 Colour the students by motivation"):
+            st.session_state.show_confounders = True
+            st.rerun()
+
+        if st.session_state.get("show_confounders", False):
+            x_range, y_range = zoom_controls(data, "lesson3_confounder_zoom")
+            fig = create_scatter_plot(
+                data,
+                show_confounders=True,
+                x_range=x_range,
+                y_range=y_range,
+            )
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption(
+                "The most motivated students sit top right: they attend more "
+                "classes *and* score higher, whatever the hours do."
+            )
+
     # Step 4: What Can We Do About Confounders?
     if st.session_state.lesson3_step >= 4:
         st.header("✅ What Can We Do About Confounders?")
@@ -436,11 +799,19 @@ def render(navigate_to):
             "Let's plot Classroom Hours vs Grades AFTER the law in blue and the ORIGINAL class in red."
         )
 
-        # Generate and show the comparison data
-        original_data = generate_classroom_data()
-        treated_data = generate_treated_data()
-
-        fig = create_instrumental_comparison_plot(original_data, treated_data)
+        # Show the comparison data
+        original_data = cohort["data"]
+        treated_data = cohort["treated"]
+
+        x_range, y_range = zoom_controls(original_data, "lesson3_comparison_zoom")
+        fig = create_instrumental_comparison_plot(
+            original_data,
+            treated_data,
+            x_range=x_range,
+            y_range=y_range,
+            original_trend=cohort["trend"],
+            treated_trend=cohort["treated_trend"],
+        )
         st.plotly_chart(fig, use_container_width=True)
 
     # Step 8: What Does the Scatter Plot Show?
@@ -463,6 +834,7 @@ def render(navigate_to):
         with col1:
             if st.button("🔄 Start Over", use_container_width=True):
                 st.session_state.lesson3_step = 1
+                st.session_state.show_confounders = False
                 st.session_state.show_math = False
                 st.rerun()
         with col2:
@@ -536,6 +908,115 @@ def render(navigate_to):
             - **Instrument-based estimate:** 2 points/hour (closer to the true causal effect)
             """
             )
+
+            st.subheader("Two-Stage Least Squares on Our Students")
+            st.markdown(
+                """
+            In the rule group, the forced extra hours were handed out at random. They move classroom hours but say nothing about motivation, so we can use them as the instrument:
+
+            1. **First stage:** predict classroom hours from the forced extra hours
+            2. **Second stage:** regress grades on those *predicted* hours
+            """
+            )
+
+            estimates = cohort["iv"]
+            naive = estimates["naive"]["params"].loc["classroom_hours"]
+            iv = estimates["iv"]["params"].loc["classroom_hours"]
+            first_stage_f = estimates["iv"]["first_stage"].loc[
+                "classroom_hours", "f_stat"
+            ]
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric(
+                    "🤖 Naive Slope",
+                    f"{naive['coef']:.2f} points/hour",
+                    help="OLS of grades on hours in the original class",
+                )
+                st.caption(f"Robust standard error: {naive['std_err']:.2f}")
+            with col2:
+                st.metric(
+                    "🎯 2SLS Estimate",
+                    f"{iv['coef']:.2f} points/hour",
+                    help="Forced extra hours as the instrument for classroom hours",
+                )
+                st.caption(
+                    f"95% CI: {iv['coef'] - 1.96 * iv['std_err']:.2f} to "
+                    f"{iv['coef'] + 1.96 * iv['std_err']:.2f} (robust)"
+                )
+
+            st.info(
+                f"""
+            **First-stage F-statistic: {first_stage_f:,.1f}** (above 10 means the instrument is strong)
+
+            The true effect built into this data is **0.2 points per extra hour**. A bigger class above narrows the interval. Grades are capped at 100%, which can pull the estimated slope slightly below the true effect.
+            """
+            )
+
+            st.subheader("Controlling for the Confounders We Can Measure")
+            st.markdown(
+                "Without an instrument, we can still *adjust* for the confounders we measured by adding them to the regression. Tick the ones to control for:"
+            )
+
+            columns = st.columns(len(ADJUSTMENT_COVARIATES))
+            controlled = [
+                name
+                for column, (name, label) in zip(columns, ADJUSTMENT_COVARIATES.items())
+                if column.checkbox(label, key=f"lesson3_control_{name}")
+            ]
+
+            # Toggling a covariate updates the cached factorisation, not a refit
+            adjusted = session_adjuster(cohort["adjuster"], n_students).fit(controlled)
+            hours = adjusted.loc["classroom_hours"]
+
+            st.metric(
+                "📐 Adjusted Hours Effect",
+                f"{hours['coef']:.2f} points/hour",
+                delta=f"{hours['coef'] - naive['coef']:+.2f} vs naive",
+                delta_color="off",
+                help="Coefficient on classroom hours with the ticked confounders held fixed",
+            )
+            st.caption(
+                f"Standard error: {hours['std_err']:.2f}. Grades in this data are capped at 100%, so even full adjustment stays above the true 0.5 points per hour."
+            )
+
+            with st.expander("🎛️ Explore: Confounding Strength vs Class Size"):
+                st.markdown(
+                    f"""
+                What if the confounders were weaker or stronger, or the classes bigger? Each square below simulates 1,000 classrooms where hours truly add **{TRUE_HOURS_EFFECT} points** per hour, then measures how far the naive slope lands from that.
+                """
+                )
+
+                sweep = load_confounding_sweep()
+                st.plotly_chart(create_bias_heatmap(sweep), use_container_width=True)
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    strength_index = st.select_slider(
+                        "Confounding strength",
+                        options=range(len(SWEEP_STRENGTHS)),
+                        value=len(SWEEP_STRENGTHS) // 2,
+                        format_func=lambda i: f"{SWEEP_STRENGTHS[i]:.2f}",
+                        key="lesson3_sweep_strength",
+                    )
+                with col2:
+                    size_index = st.select_slider(
+                        "Students per class",
+                        options=range(len(SWEEP_SAMPLE_SIZES)),
+                        value=len(SWEEP_SAMPLE_SIZES) // 2,
+                        format_func=lambda i: f"{SWEEP_SAMPLE_SIZES[i]:,}",
+                        key="lesson3_sweep_size",
+                    )
+
+                st.plotly_chart(
+                    create_slope_histogram(sweep["slopes"][size_index, strength_index]),
+                    use_container_width=True,
+                )
+                st.caption(
+                    "Bigger classes shrink the spread, but only zero confounding "
+                    "moves the centre back to the true effect. The simulation "
+                    "leaves out the lesson data's grade cap at 100%."
+                )
     else:
         if st.button("Next →", type="primary", use_container_width=True):
             st.session_state.lesson3_step += 1
@@ -2,6 +2,18 @@ import streamlit as st
 import plotly.graph_objects as go
 import numpy as np
 
+from components.figure_templates import FigureTemplate
+from engines.event_study import EventStudy
+from engines.panel_did import Panel, simulate_panel, wide_to_panel
+
+# Staggered launch explorer: territories launch in year 4, 6, 8 or never,
+# and the feature's effect starts at +2 points and grows 1 point a year
+EVENT_STUDY_UNITS = 20_000
+EVENT_STUDY_YEARS = 12
+EVENT_STUDY_LAUNCHES = (None, 4, 6, 8)
+EVENT_STUDY_EFFECT = 2.0
+EVENT_STUDY_GROWTH = 1.0
+
 
 def generate_territory_data():
     """Generate retention data for both territories"""
@@ -28,221 +40,282 @@ def generate_territory_data():
     return years, retention_a, retention_b
 
 
-def create_retention_plot(years, retention_a, retention_b, stage="parallel"):
-    """Create retention trends plot based on stage"""
-    fig = go.Figure()
+def territory_did(years, retention_a, retention_b, adoption_year=3):
+    """Group-time means, 2×2 DiD and TWFE estimate of the two territories
 
-    if stage == "parallel":
-        # Show only years 1-2, both lines parallel
-        display_years = years[:2]
-        display_a = retention_a[:2]
-        display_b = retention_b[:2]
-
-        fig.add_trace(
-            go.Scatter(
-                x=display_years,
-                y=display_a,
-                mode="lines+markers",
-                name="Territory A (Treatment)",
-                line=dict(color="red", width=3),
-                marker=dict(size=8),
-            )
+    Territory A has the feature from adoption_year on; B never does.
+    """
+    panel = Panel(
+        wide_to_panel(
+            years,
+            {"Territory A": retention_a, "Territory B": retention_b},
+            {"Territory A": adoption_year},
         )
-
-        fig.add_trace(
-            go.Scatter(
-                x=display_years,
-                y=display_b,
-                mode="lines+markers",
-                name="Territory B (Control)",
-                line=dict(color="blue", width=3),
-                marker=dict(size=8),
+    )
+    return {
+        "means": panel.group_time_means(),
+        "did": panel.did_2x2(),
+        "twfe": panel.twfe(),
+    }
+
+
+@st.cache_resource
+def load_territory_did():
+    """DiD estimates of the lesson's territory data, computed once"""
+    return territory_did(*generate_territory_data())
+
+
+@st.cache_resource
+def load_retention_templates():
+    """Retention plot scaffolding before and after the feature line, built once"""
+    templates = {}
+    for period in ["before", "after"]:
+        fig = go.Figure()
+
+        if period == "after":
+            # Add feature line
+            fig.add_vline(
+                x=2.5,
+                line_dash="dash",
+                line_color="green",
+                annotation_text="Feature Introduced",
+                annotation_position="top",
             )
-        )
 
-        title = "Before Period: Parallel Trends"
-
-    elif stage == "spike":
-        # Show Territory A extending to year 4, Territory B stops at year 2
-        display_years = years[:4]
-        display_a = retention_a[:4]  # Show A's full trend including year 4
-        display_b = retention_b[:2]  # Keep B at year 2
-
-        fig.add_trace(
-            go.Scatter(
-                x=display_years,
-                y=display_a,
-                mode="lines+markers",
-                name="Territory A (Treatment)",
-                line=dict(color="red", width=3),
-                marker=dict(size=8),
-            )
+        fig.update_layout(
+            xaxis_title="Year",
+            yaxis_title="Retention Rate (%)",
+            xaxis=dict(range=[0.5, 4.5], dtick=1),
+            yaxis=dict(range=[60, 95]),
+            width=700,
+            height=500,
+            showlegend=True,
         )
 
-        fig.add_trace(
-            go.Scatter(
-                x=years[:2],
-                y=display_b,
-                mode="lines+markers",
-                name="Territory B (Control)",
-                line=dict(color="blue", width=3),
-                marker=dict(size=8),
-            )
+        templates[period] = FigureTemplate(
+            fig,
+            traces={
+                "treatment": go.Scatter(
+                    mode="lines+markers",
+                    name="Territory A (Treatment)",
+                    line=dict(color="red", width=3),
+                    marker=dict(size=8),
+                ),
+                "control": go.Scatter(
+                    mode="lines+markers",
+                    name="Territory B (Control)",
+                    line=dict(color="blue", width=3),
+                    marker=dict(size=8),
+                ),
+            },
         )
+    return templates
 
-        # Add feature line
-        fig.add_vline(
-            x=2.5,
-            line_dash="dash",
-            line_color="green",
-            annotation_text="Feature Introduced",
-            annotation_position="top",
-        )
 
-        # Show naive estimate (year 2 to year 4)
-        naive_effect = retention_a[3] - retention_a[1]  # Year 4 - Year 2
-        fig.add_annotation(
-            x=3.2,
-            y=retention_a[3] + 2,
-            text=f"Naive Effect: +{naive_effect}",
-            showarrow=False,
-            bgcolor="orange",
-            bordercolor="black",
-            borderwidth=1,
-            font=dict(size=12),
-        )
+def create_retention_plot(estimates, stage="parallel"):
+    """Create retention trends plot based on stage
 
-        title = "Territory A Spikes After Feature"
+    estimates is territory_did's result, cached by load_territory_did, so
+    switching stage never rebuilds the panel or its DiD.
+    """
+    templates = load_retention_templates()
+    means, did = estimates["means"], estimates["did"]
+    years = means.index.tolist()
+    retention_a = means["treated"].tolist()
+    retention_b = means["control"].tolist()
 
-    elif stage == "reveal_trend":
-        # Show both territories extending to year 4
-        display_years = years[:4]
-        display_a = retention_a[:4]  # Show A's full trend
-        display_b = retention_b[:4]  # Show B's full trend
-
-        fig.add_trace(
-            go.Scatter(
-                x=display_years,
-                y=display_a,
-                mode="lines+markers",
-                name="Territory A (Treatment)",
-                line=dict(color="red", width=3),
-                marker=dict(size=8),
-            )
+    if stage == "parallel":
+        # Show only years 1-2, both lines parallel
+        return templates["before"].figure(
+            traces=[
+                ("treatment", dict(x=years[:2], y=retention_a[:2])),
+                ("control", dict(x=years[:2], y=retention_b[:2])),
+            ],
+            title="Before Period: Parallel Trends",
         )
 
-        fig.add_trace(
-            go.Scatter(
-                x=display_years,
-                y=display_b,
-                mode="lines+markers",
-                name="Territory B (Control)",
-                line=dict(color="blue", width=3),
-                marker=dict(size=8),
-            )
+    elif stage == "spike":
+        # Show Territory A extending to year 4, Territory B stops at year 2
+        # Show naive estimate (A's change from before to after the feature)
+        naive_effect = did["treated_change"]
+        return templates["after"].figure(
+            traces=[
+                ("treatment", dict(x=years[:4], y=retention_a[:4])),
+                ("control", dict(x=years[:2], y=retention_b[:2])),
+            ],
+            annotations=[
+                dict(
+                    x=3.2,
+                    y=retention_a[3] + 2,
+                    text=f"Naive Effect: {naive_effect:+g}",
+                    showarrow=False,
+                    bgcolor="orange",
+                    bordercolor="black",
+                    borderwidth=1,
+                    font=dict(size=12),
+                )
+            ],
+            title="Territory A Spikes After Feature",
         )
 
-        fig.add_vline(
-            x=2.5,
-            line_dash="dash",
-            line_color="green",
-            annotation_text="Feature Introduced",
-            annotation_position="top",
+    elif stage == "reveal_trend":
+        # Show both territories extending to year 4
+        return templates["after"].figure(
+            traces=[
+                ("treatment", dict(x=years[:4], y=retention_a[:4])),
+                ("control", dict(x=years[:4], y=retention_b[:4])),
+            ],
+            title="Territory B Also Trending Up!",
         )
 
-        title = "Territory B Also Trending Up!"
-
     elif stage == "full_did":
         # Show full period with DiD calculation
-        fig.add_trace(
-            go.Scatter(
-                x=years,
-                y=retention_a,
-                mode="lines+markers",
-                name="Territory A (Treatment)",
-                line=dict(color="red", width=3),
-                marker=dict(size=8),
-            )
-        )
-
-        fig.add_trace(
-            go.Scatter(
-                x=years,
-                y=retention_b,
-                mode="lines+markers",
-                name="Territory B (Control)",
-                line=dict(color="blue", width=3),
-                marker=dict(size=8),
-            )
-        )
-
-        fig.add_vline(
-            x=2.5,
-            line_dash="dash",
-            line_color="green",
-            annotation_text="Feature Introduced",
-            annotation_position="top",
+        return templates["after"].figure(
+            traces=[
+                ("treatment", dict(x=years, y=retention_a)),
+                ("control", dict(x=years, y=retention_b)),
+            ],
+            annotations=[
+                dict(
+                    x=2.8,  # Slightly left of year 3
+                    y=retention_a[2],  # Arrow tip at Year 3 data point for A
+                    text=f"A: {did['treated_change']:+g}",
+                    showarrow=True,
+                    arrowhead=2,
+                    arrowcolor="red",
+                    arrowwidth=2,
+                    bgcolor="white",
+                    bordercolor="red",
+                    borderwidth=1,
+                    font=dict(size=11, color="red"),
+                    ax=-50,  # Text positioned 50 pixels left of arrow tip
+                    ay=-30,  # Text positioned 30 pixels above arrow tip
+                ),
+                # Territory B annotation - positioned to the right
+                dict(
+                    x=3.2,  # Slightly right of year 3
+                    y=retention_b[2],  # Arrow tip at Year 3 data point for B
+                    text=f"B: {did['control_change']:+g}",
+                    showarrow=True,
+                    arrowhead=2,
+                    arrowcolor="blue",
+                    arrowwidth=2,
+                    bgcolor="white",
+                    bordercolor="blue",
+                    borderwidth=1,
+                    font=dict(size=11, color="blue"),
+                    ax=50,  # Text positioned 50 pixels right of arrow tip
+                    ay=-30,  # Text positioned 30 pixels above arrow tip
+                ),
+                # DiD result annotation - positioned higher up to avoid collision
+                dict(
+                    x=3,
+                    y=87,  # Moved higher up
+                    text=(
+                        f"DiD = {did['treated_change']:g} - "
+                        f"{did['control_change']:g} = {did['did']:+g}"
+                    ),
+                    showarrow=False,
+                    bgcolor="yellow",
+                    bordercolor="black",
+                    borderwidth=2,
+                    font=dict(size=14, color="black", weight="bold"),
+                ),
+            ],
+            title="Difference-in-Differences Calculation",
         )
 
-        fig.add_annotation(
-            x=2.8,  # Slightly left of year 3
-            y=retention_a[2],  # Arrow tip points exactly at Year 3 data point for A
-            text="A: +15",
-            showarrow=True,
-            arrowhead=2,
-            arrowcolor="red",
-            arrowwidth=2,
-            bgcolor="white",
-            bordercolor="red",
-            borderwidth=1,
-            font=dict(size=11, color="red"),
-            ax=-50,  # Text positioned 50 pixels left of arrow tip
-            ay=-30,  # Text positioned 30 pixels above arrow tip
-        )
-
-        # Territory B annotation - positioned to the right
-        fig.add_annotation(
-            x=3.2,  # Slightly right of year 3
-            y=retention_b[2],  # Arrow tip points exactly at Year 3 data point for B
-            text="B: +10",
-            showarrow=True,
-            arrowhead=2,
-            arrowcolor="blue",
-            arrowwidth=2,
-            bgcolor="white",
-            bordercolor="blue",
-            borderwidth=1,
-            font=dict(size=11, color="blue"),
-            ax=50,  # Text positioned 50 pixels right of arrow tip
-            ay=-30,  # Text positioned 30 pixels above arrow tip
-        )
 
-        # DiD result annotation - positioned higher up to avoid collision
-        fig.add_annotation(
-            x=3,
-            y=87,  # Moved higher up
-            text="DiD = 15 - 10 = +5",
-            showarrow=False,
-            bgcolor="yellow",
-            bordercolor="black",
-            borderwidth=2,
-            font=dict(size=14, color="black", weight="bold"),
-        )
+@st.cache_resource
+def load_event_study():
+    """Staggered-launch panel with its event study and TWFE fit, built once"""
+    frame = simulate_panel(
+        EVENT_STUDY_UNITS,
+        EVENT_STUDY_YEARS,
+        adoption_periods=tuple(
+            None if year is None else year - 1 for year in EVENT_STUDY_LAUNCHES
+        ),
+        effect=EVENT_STUDY_EFFECT,
+        effect_growth=EVENT_STUDY_GROWTH,
+        n_territories=200,
+        seed=5,
+    )
+    frame["period"] += 1  # Years 1-12
+    panel = Panel(frame)
+    return {"study": EventStudy(panel), "twfe": panel.twfe_fit(frame["territory"])}
 
-        title = "Difference-in-Differences Calculation"
 
+@st.cache_resource
+def load_event_study_template():
+    """Event study axes, reference lines and trace styles, built once"""
+    fig = go.Figure()
+    fig.add_hline(y=0, line_color="gray")
+    fig.add_vline(
+        x=-0.5,
+        line_dash="dash",
+        line_color="green",
+        annotation_text="Launch",
+        annotation_position="top",
+    )
     fig.update_layout(
-        title=title,
-        xaxis_title="Year",
-        yaxis_title="Retention Rate (%)",
-        xaxis=dict(range=[0.5, 4.5], dtick=1),
-        yaxis=dict(range=[60, 95]),
-        width=700,
-        height=500,
+        title="Effect by Years Since Launch",
+        xaxis_title="Years since launch (year before launch = reference)",
+        yaxis_title="Effect on retention (pp)",
+        xaxis=dict(dtick=1),
+        height=450,
         showlegend=True,
     )
+    return FigureTemplate(
+        fig,
+        traces={
+            "cohort": go.Scatter(
+                mode="lines",
+                line=dict(width=1),
+                opacity=0.4,
+            ),
+            "average": go.Scatter(
+                mode="lines+markers",
+                name="All launches",
+                line=dict(color="red", width=3),
+                marker=dict(size=8),
+            ),
+            "truth": go.Scatter(
+                mode="lines",
+                name="True effect",
+                line=dict(color="black", dash="dot"),
+            ),
+        },
+    )
+
 
-    return fig
+def create_event_study_plot(study, window, control):
+    """Leads and lags of each launch cohort and their average"""
+    cohorts = study.cohort_event_table(window, control)
+    average = study.event_time_effects(window, control)["att"]
+
+    traces = [
+        (
+            "cohort",
+            dict(
+                x=row.dropna().index.tolist(),
+                y=row.dropna().tolist(),
+                name=f"Launched year {cohort}",
+            ),
+        )
+        for cohort, row in cohorts.iterrows()
+    ]
+    lags = list(range(max(window[0], 0), window[1] + 1))
+    traces += [
+        ("average", dict(x=average.index.tolist(), y=average.tolist())),
+        (
+            "truth",
+            dict(
+                x=lags,
+                y=[EVENT_STUDY_EFFECT + EVENT_STUDY_GROWTH * e for e in lags],
+            ),
+        ),
+    ]
+    return load_event_study_template().figure(traces=traces)
 
 
 def render(navigate_to):
@@ -329,8 +402,10 @@ def render(navigate_to):
     if st.session_state.lesson5_step >= 5:
         st.header("📊 Interactive Analysis")
 
-        # Generate data
-        years, retention_a, retention_b = generate_territory_data()
+        # Group-time means and DiD estimates of the territory panel, built once
+        estimates = load_territory_did()
+        did = estimates["did"]
+        naive = f"{did['treated_change']:+g}"
 
         # Stage progression buttons
         col1, col2, col3, col4 = st.columns(4)
@@ -362,9 +437,7 @@ def render(navigate_to):
                 st.rerun()
 
         # Display the plot
-        fig = create_retention_plot(
-            years, retention_a, retention_b, st.session_state.did_stage
-        )
+        fig = create_retention_plot(estimates, st.session_state.did_stage)
         st.plotly_chart(fig, use_container_width=True)
 
         # Contextual explanations based on current stage
@@ -375,10 +448,10 @@ def render(navigate_to):
 
         elif st.session_state.did_stage == "spike":
             st.warning(
-                """
+                f"""
             **Stage 2 - Naive Analysis:** Territory A jumps up after the feature! 
             
-            🤔 **If we stopped here, we might think:** "The feature caused a +10 point increase!"
+            🤔 **If we stopped here, we might think:** "The feature caused a {naive} point increase!"
             
             But wait... we have a comparison group that used to trend similarly. Let's see what happened to them.
             """
@@ -386,7 +459,7 @@ def render(navigate_to):
 
         elif st.session_state.did_stage == "reveal_trend":
             st.warning(
-                """
+                f"""
             **Stage 3 - The Plot Thickens:** Territory B ALSO increased over the same period!
             
             🧠 **Key Insight:** Maybe both territories were naturally trending upward due to:
@@ -394,20 +467,20 @@ def render(navigate_to):
             - Seasonal effects  
             - Company-wide improvements
             
-            The naive +10 estimate is **confounded** by this general trend.
+            The naive {naive} estimate is **confounded** by this general trend.
             """
             )
 
         elif st.session_state.did_stage == "full_did":
             st.success(
-                """
+                f"""
             **Stage 4 - DiD Analysis:** Now we can isolate the true causal effect!
             
-            - Territory A change (Year 2 → Year 4): **+15 points**
-            - Territory B change (Year 2 → Year 4): **+10 points**  
-            - **Difference-in-Differences**: 15 - 10 = **+5 points**
+            - Territory A change (Years 1-2 → Years 3-4): **{did['treated_change']:+g} points**
+            - Territory B change (Years 1-2 → Years 3-4): **{did['control_change']:+g} points**  
+            - **Difference-in-Differences**: {did['treated_change']:g} - {did['control_change']:g} = **{did['did']:+g} points**
             
-            The feature's true causal effect is +5 points, not the naive +15 estimate.
+            The feature's true causal effect is {did['did']:+g} points, not the naive {naive} estimate.
             """
             )
 
@@ -415,13 +488,21 @@ def render(navigate_to):
             col1, col2, col3 = st.columns(3)
             with col1:
                 st.metric(
-                    "Territory A Change", "+15 pp", help="Feature + general trend"
+                    "Territory A Change",
+                    f"{did['treated_change']:+g} pp",
+                    help="Feature + general trend",
                 )
             with col2:
-                st.metric("Territory B Change", "+10 pp", help="General trend only")
+                st.metric(
+                    "Territory B Change",
+                    f"{did['control_change']:+g} pp",
+                    help="General trend only",
+                )
             with col3:
                 st.metric(
-                    "True Feature Effect", "+5 pp", help="DiD isolates causal effect"
+                    "True Feature Effect",
+                    f"{did['did']:+g} pp",
+                    help="DiD isolates causal effect",
                 )
 
     # Step 5: Key Takeaways
@@ -446,6 +527,87 @@ def render(navigate_to):
         """
         )
 
+        with st.expander("🪜 Explore: Staggered Launches Across Territories"):
+            st.markdown(
+                f"""
+            Real rollouts rarely happen all at once. Here 200 territories launch the feature in year 4, 6 or 8, or not at all. Its effect starts at **{EVENT_STUDY_EFFECT:+g} points** and grows by **{EVENT_STUDY_GROWTH:g} point** every year after launch.
+
+            The event study lines every territory up by **years since launch**. Points before launch (leads) should sit near zero if trends were parallel; points after (lags) trace how the effect builds.
+            """
+            )
+
+            estimates = load_event_study()
+            study = estimates["study"]
+            event_times = study.cohort_time_effects()["event_time"]
+
+            col1, col2 = st.columns([3, 2])
+            with col1:
+                window = st.slider(
+                    "Event window (years since launch)",
+                    min_value=int(event_times.min()),
+                    max_value=int(event_times.max()),
+                    value=(-4, 6),
+                    key="lesson5_event_window",
+                )
+            with col2:
+                control = st.radio(
+                    "Compare against",
+                    ["never", "not_yet"],
+                    format_func=lambda c: (
+                        "Never launched" if c == "never" else "Not launched yet"
+                    ),
+                    horizontal=True,
+                    key="lesson5_event_control",
+                )
+
+            st.plotly_chart(
+                create_event_study_plot(study, window, control),
+                use_container_width=True,
+            )
+
+            # The simulated effect over the same launched territory-years
+            effects = study.cohort_time_effects(control)
+            lags = effects[effects["event_time"].between(max(window[0], 0), window[1])]
+            if lags.empty:
+                st.info("Stretch the window past the launch to estimate the effect.")
+            else:
+                true_att = np.average(
+                    EVENT_STUDY_EFFECT + EVENT_STUDY_GROWTH * lags["event_time"],
+                    weights=lags["n_units"],
+                )
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric(
+                        "Event Study Average",
+                        f"{study.overall_att(window, control):+.2f} pp",
+                        help=(
+                            "Launched years in the window, each launch compared "
+                            + (
+                                "only with territories that never launched"
+                                if control == "never"
+                                else "only with territories that had not launched yet"
+                            )
+                        ),
+                    )
+                with col2:
+                    st.metric(
+                        "Single TWFE Regression",
+                        f"{estimates['twfe']['coef']:+.2f} pp",
+                        help="One two-way fixed-effects coefficient over all years",
+                    )
+                with col3:
+                    st.metric(
+                        "True Average Effect",
+                        f"{true_att:+.2f} pp",
+                        help="Over the same launched territory-years",
+                    )
+            st.caption(
+                "When the effect grows over time, one TWFE regression compares "
+                "late launches with territories that launched earlier and are "
+                "still climbing, which drags its estimate down. Averaging each "
+                "launch's own DiD avoids those comparisons."
+            )
+
     # Optional Math Section
     if st.session_state.lesson5_step >= 6 and st.session_state.show_math:
         st.divider()
@@ -468,15 +630,22 @@ def render(navigate_to):
         )
 
         st.subheader("Our Example")
+        did = load_territory_did()["did"]
         st.latex(
-            r"""
-        \begin{align}
-        \text{Territory A change} &= 85 - 70 = 15 \\
-        \text{Territory B change} &= 78 - 68 = 10 \\
-        \text{DiD} &= 15 - 10 = 5
-        \end{align}
+            rf"""
+        \begin{{align}}
+        \text{{Territory A change}} &= {did['treated_post']:g} - {did['treated_pre']:g} = {did['treated_change']:g} \\
+        \text{{Territory B change}} &= {did['control_post']:g} - {did['control_pre']:g} = {did['control_change']:g} \\
+        \text{{DiD}} &= {did['treated_change']:g} - {did['control_change']:g} = {did['did']:g}
+        \end{{align}}
         """
         )
+        st.markdown(
+            "Each side averages the years before (1-2) and after (3-4) the feature. "
+            "A two-way fixed-effects regression of retention on the feature with "
+            "territory and year effects gives the same answer here: "
+            f"**{load_territory_did()['twfe']:+g} points**."
+        )
 
         st.success(
             """
@@ -2,9 +2,31 @@ import streamlit as st
 import plotly.graph_objects as go
 import numpy as np
 
-
-def create_city_map(selected_location=None):
-    """Create interactive city map with pin placement"""
+from components.figure_templates import FigureTemplate
+
+
+CITY_LOCATIONS = {
+    "fastfood": {
+        "x": 2,
+        "y": 8,
+        "color": "red",
+        "symbol": "square",
+        "name": "Fast Food Restaurant",
+    },
+    "gym": {"x": 8, "y": 8, "color": "blue", "symbol": "diamond", "name": "Gym"},
+    "hospital": {
+        "x": 5,
+        "y": 2,
+        "color": "green",
+        "symbol": "cross",
+        "name": "Hospital",
+    },
+}
+
+
+@st.cache_resource
+def load_city_map_template():
+    """City background, locations, layout and pin style, built once per process"""
     fig = go.Figure()
 
     # Add city background
@@ -20,25 +42,7 @@ def create_city_map(selected_location=None):
     )
 
     # Add locations
-    locations = {
-        "fastfood": {
-            "x": 2,
-            "y": 8,
-            "color": "red",
-            "symbol": "square",
-            "name": "Fast Food Restaurant",
-        },
-        "gym": {"x": 8, "y": 8, "color": "blue", "symbol": "diamond", "name": "Gym"},
-        "hospital": {
-            "x": 5,
-            "y": 2,
-            "color": "green",
-            "symbol": "cross",
-            "name": "Hospital",
-        },
-    }
-
-    for loc_id, loc in locations.items():
+    for loc_id, loc in CITY_LOCATIONS.items():
         fig.add_trace(
             go.Scatter(
                 x=[loc["x"]],
@@ -56,13 +60,19 @@ def create_city_map(selected_location=None):
             )
         )
 
-    # Add big pin if location is selected
-    if selected_location and selected_location in locations:
-        loc = locations[selected_location]
-        fig.add_trace(
-            go.Scatter(
-                x=[loc["x"]],
-                y=[loc["y"] + 0.5],  # Slightly above the location
+    fig.update_layout(
+        title="City Map - Where Will You Place Your Sign?",
+        xaxis=dict(range=[0, 10], showgrid=False, zeroline=False, showticklabels=False),
+        yaxis=dict(range=[0, 10], showgrid=False, zeroline=False, showticklabels=False),
+        width=600,
+        height=500,
+        plot_bgcolor="white",
+    )
+
+    return FigureTemplate(
+        fig,
+        traces={
+            "pin": go.Scatter(
                 mode="markers+text",
                 marker=dict(
                     size=30,
@@ -75,18 +85,20 @@ def create_city_map(selected_location=None):
                 name="Your Sign",
                 showlegend=False,
             )
-        )
-
-    fig.update_layout(
-        title="City Map - Where Will You Place Your Sign?",
-        xaxis=dict(range=[0, 10], showgrid=False, zeroline=False, showticklabels=False),
-        yaxis=dict(range=[0, 10], showgrid=False, zeroline=False, showticklabels=False),
-        width=600,
-        height=500,
-        plot_bgcolor="white",
+        },
     )
 
-    return fig
+
+def create_city_map(selected_location=None):
+    """Create interactive city map with pin placement"""
+    traces = []
+
+    # Add big pin if location is selected
+    if selected_location and selected_location in CITY_LOCATIONS:
+        loc = CITY_LOCATIONS[selected_location]
+        traces.append(("pin", dict(x=[loc["x"]], y=[loc["y"] + 0.5])))  # Slightly above
+
+    return load_city_map_template().figure(traces=traces)
 
 
 def get_location_message(location):
@@ -3,13 +3,47 @@ import plotly.graph_objects as go
 import numpy as np
 import pandas as pd
 
+from components.figure_templates import FigureTemplate
+from components.frame_chart import frame_chart
+from engines.shot_power import power_grid, shot_spread
+
+N_SHOTS = 10  # Rounds in each test group
+
+# Every value each theory slider can take
+THEORY_SLIDERS = {
+    "warmup": range(6, 10),  # Work start time, 6-9 AM
+    "food": range(0, 6),  # Breakfast items
+    "fatigue": range(0, 6),  # Cups of coffee
+    "hangover": range(0, 9),  # Pints last night
+}
+
+# Starting value of each theory slider, kept in session state under
+# theory_<name> so a setting picked in the chart can move the slider
+THEORY_DEFAULTS = {"warmup": 9, "food": 2, "fatigue": 2, "hangover": 6}
+
+# Slider caption and value format of each theory, for client-side frames
+THEORY_FRAME_LABELS = {
+    "warmup": ("Work Start Time", "{} AM"),
+    "food": ("Breakfast Amount", "{} items"),
+    "fatigue": ("Cups of Coffee", "{} cups"),
+    "hangover": ("Pints Last Night", "{} pints"),
+}
+
+# Design sizes of the power explorer: shots from one rifle, or rifles of
+# N_SHOTS shots each
+POWER_SHOT_COUNTS = [1, 2, 3, 4, 5, 6, 8, 10, 12, 15, 20, 25, 30, 40, 50]
+POWER_RIFLE_COUNTS = [1, 2, 3, 4, 5, 6, 8, 10]
+POWER_PINTS = range(1, 7)  # theory_severity is full from 6 pints on
+TARGET_POWER = 0.8
+
 
 def generate_target_data(
     time_of_day, hangover_severity, theory="hangover", theory_value=0
 ):
     """Generate rifle accuracy data based on time and hangover level"""
-    # Use theory_value to create different random seeds for visual variety
-    np.random.seed(42 + int(theory_value * 10))  # Changes based on slider value
+    # Use theory_value to create different random seeds for visual variety.
+    # A private RandomState keeps the same shots as seeding the global RNG did
+    rng = np.random.RandomState(42 + int(theory_value * 10))
 
     # Base accuracy (distance from bullseye center)
     base_accuracy = 2.0  # inches from center
@@ -35,17 +69,17 @@ def generate_target_data(
     time_effect = 0.2 if time_of_day == "Morning" else 0.0
 
     # Generate shot coordinates (x, y from bullseye center)
-    n_shots = 10
     accuracy_std = base_accuracy + hangover_effect + time_effect
 
-    x_coords = np.random.normal(0, accuracy_std, n_shots)
-    y_coords = np.random.normal(0, accuracy_std, n_shots)
+    x_coords = rng.normal(0, accuracy_std, N_SHOTS)
+    y_coords = rng.normal(0, accuracy_std, N_SHOTS)
 
     return x_coords, y_coords
 
 
-def create_target_plot(morning_shots, afternoon_shots):
-    """Create interactive target visualization"""
+@st.cache_resource
+def load_target_template():
+    """Target rings, bullseye, layout and shot styles, built once per process"""
     fig = go.Figure()
 
     # Draw target rings
@@ -71,30 +105,6 @@ def create_target_plot(morning_shots, afternoon_shots):
         line=dict(color="red"),
     )
 
-    # Morning shots (red)
-    fig.add_trace(
-        go.Scatter(
-            x=morning_shots[0],
-            y=morning_shots[1],
-            mode="markers",
-            marker=dict(color="red", size=8, symbol="x"),
-            name="Morning Shots",
-            text=["Morning"] * len(morning_shots[0]),
-        )
-    )
-
-    # Afternoon shots (blue)
-    fig.add_trace(
-        go.Scatter(
-            x=afternoon_shots[0],
-            y=afternoon_shots[1],
-            mode="markers",
-            marker=dict(color="blue", size=8, symbol="circle"),
-            name="Afternoon Shots",
-            text=["Afternoon"] * len(afternoon_shots[0]),
-        )
-    )
-
     fig.update_layout(
         title="Lee Enfield Rifle Test Results",
         xaxis_title="Distance from Center (inches)",
@@ -107,7 +117,35 @@ def create_target_plot(morning_shots, afternoon_shots):
         plot_bgcolor="white",
     )
 
-    return fig
+    return FigureTemplate(
+        fig,
+        traces={
+            # Morning shots (red)
+            "morning": go.Scatter(
+                mode="markers",
+                marker=dict(color="red", size=8, symbol="x"),
+                name="Morning Shots",
+                text=["Morning"] * N_SHOTS,
+            ),
+            # Afternoon shots (blue)
+            "afternoon": go.Scatter(
+                mode="markers",
+                marker=dict(color="blue", size=8, symbol="circle"),
+                name="Afternoon Shots",
+                text=["Afternoon"] * N_SHOTS,
+            ),
+        },
+    )
+
+
+def create_target_plot(morning_shots, afternoon_shots):
+    """Create interactive target visualization"""
+    return load_target_template().figure(
+        traces=[
+            ("morning", dict(x=morning_shots[0], y=morning_shots[1])),
+            ("afternoon", dict(x=afternoon_shots[0], y=afternoon_shots[1])),
+        ]
+    )
 
 
 def calculate_accuracy_score(shots):
@@ -117,6 +155,174 @@ def calculate_accuracy_score(shots):
     return np.mean(distances)
 
 
+def theory_severity(theory, theory_value):
+    """Morning hangover severity behind a theory slider setting"""
+    if theory == "hangover":
+        # Calculate hangover severity (0-1 scale)
+        return min(theory_value / 6.0, 1.0)
+    return 0.8  # Still hungover regardless
+
+
+@st.cache_resource
+def load_shot_table():
+    """Shots and scores for every theory slider setting, drawn once per process
+
+    shots has shape (settings, time of day, x/y, shots) with morning first;
+    scores has shape (settings, time of day). Slider moves are then lookups.
+    """
+    settings = [
+        (theory, value) for theory, values in THEORY_SLIDERS.items() for value in values
+    ]
+    shots = np.empty((len(settings), 2, 2, N_SHOTS))
+    scores = np.empty((len(settings), 2))
+
+    for i, (theory, value) in enumerate(settings):
+        severity = theory_severity(theory, value)
+        shots[i, 0] = generate_target_data("Morning", severity, theory, value)
+        shots[i, 1] = generate_target_data("Afternoon", severity * 0.3, theory, value)
+        scores[i] = [calculate_accuracy_score(group) for group in shots[i]]
+
+    shots.flags.writeable = False
+    scores.flags.writeable = False
+    return {
+        "index": {setting: i for i, setting in enumerate(settings)},
+        "shots": shots,
+        "scores": scores,
+    }
+
+
+def lookup_shots(theory, theory_value):
+    """Morning shots, afternoon shots and their scores for a slider setting"""
+    table = load_shot_table()
+    i = table["index"][(theory, theory_value)]
+    morning, afternoon = table["shots"][i]
+    morning_score, afternoon_score = table["scores"][i]
+    return morning, afternoon, morning_score, afternoon_score
+
+
+def create_target_frames_plot(theory, theory_value):
+    """Target plot with every slider setting of a theory as client-side frames
+
+    The figure carries one frame per slider value and Plotly's own slider,
+    so scrubbing swaps the shots in the browser without a Streamlit rerun.
+    It opens on theory_value; the averages follow along in the title. Each
+    step's value is the slider value it shows, for frame_chart to report.
+    """
+    table = load_shot_table()
+    caption, value_format = THEORY_FRAME_LABELS[theory]
+
+    frames = []
+    for value in THEORY_SLIDERS[theory]:
+        i = table["index"][(theory, value)]
+        morning, afternoon = table["shots"][i]
+        morning_score, afternoon_score = table["scores"][i]
+        frames.append(
+            go.Frame(
+                name=value_format.format(value),
+                data=[
+                    go.Scatter(x=morning[0], y=morning[1]),
+                    go.Scatter(x=afternoon[0], y=afternoon[1]),
+                ],
+                traces=[0, 1],
+                layout=dict(
+                    title_text=(
+                        "Lee Enfield Rifle Test Results<br>"
+                        f'<sup>Morning {morning_score:.1f}" · '
+                        f'Afternoon {afternoon_score:.1f}" from center</sup>'
+                    )
+                ),
+            )
+        )
+
+    active = THEORY_SLIDERS[theory].index(theory_value)
+    morning, afternoon, _, _ = lookup_shots(theory, theory_value)
+    fig = create_target_plot(morning, afternoon)
+    fig.frames = frames
+    fig.update_layout(
+        title_text=frames[active].layout.title.text,
+        height=580,
+        margin=dict(b=120),
+        sliders=[
+            dict(
+                active=active,
+                currentvalue=dict(prefix=f"{caption}: "),
+                pad=dict(t=50),
+                steps=[
+                    dict(
+                        label=frame.name,
+                        value=str(value),
+                        method="animate",
+                        args=[
+                            [frame.name],
+                            dict(
+                                mode="immediate",
+                                frame=dict(duration=0, redraw=False),
+                                transition=dict(duration=0),
+                            ),
+                        ],
+                    )
+                    for value, frame in zip(THEORY_SLIDERS[theory], frames)
+                ],
+            )
+        ],
+    )
+    return fig
+
+
+def pick_target_frame(theory):
+    """Move a theory's slider to the setting let go on in the chart"""
+    picked = st.session_state[f"target_frames_{theory}"]
+    if picked is not None:
+        st.session_state[f"theory_{theory}"] = int(picked["value"])
+
+
+@st.cache_resource
+def load_power_grid(vary):
+    """Simulated power for every pints level and design size, run once"""
+    sizes = POWER_SHOT_COUNTS if vary == "shots" else POWER_RIFLE_COUNTS
+    severities = [theory_severity("hangover", pints) for pints in POWER_PINTS]
+    return sizes, power_grid(severities, sizes, vary=vary, n_shots=N_SHOTS)
+
+
+def create_power_plot(sizes, power, vary):
+    """Power curves of the rifle test, one per pints level"""
+    fig = go.Figure()
+
+    for j, pints in enumerate(POWER_PINTS):
+        opacity = 0.25 + 0.75 * j / (len(POWER_PINTS) - 1)
+        fig.add_trace(
+            go.Scatter(
+                x=sizes,
+                y=power[:, j],
+                mode="lines+markers",
+                name=f"{pints} pints",
+                line=dict(color=f"rgba(200,0,0,{opacity:.2f})"),
+                hovertemplate="%{x}: %{y:.0%} power<extra>%{fullData.name}</extra>",
+            )
+        )
+
+    fig.add_hline(
+        y=TARGET_POWER,
+        line_dash="dash",
+        line_color="green",
+        annotation_text=f"{TARGET_POWER:.0%} power",
+    )
+
+    fig.update_layout(
+        title="Chance of Spotting the Hangover",
+        xaxis_title=(
+            "Shots in each group"
+            if vary == "shots"
+            else f"Rifles ({N_SHOTS} shots each)"
+        ),
+        yaxis_title="Power",
+        yaxis=dict(range=[0, 1.02], tickformat=".0%"),
+        height=450,
+    )
+
+    return fig
+
+
 def render(navigate_to):
     # Back button
     if st.button("← Back to Home"):
@@ -244,10 +450,11 @@ def render(navigate_to):
                 )
 
         # Active Theory Details
-        hangover_severity = 0.8  # Default hangover level
         pints_last_night = 6  # Default for logic checking
         theory_value = 0  # Default slider value
         current_theory = "hangover"  # Default theory
+        for theory, default in THEORY_DEFAULTS.items():
+            st.session_state.setdefault(f"theory_{theory}", default)
 
         if st.session_state.active_theory == "warmup":
             current_theory = "warmup"
@@ -258,9 +465,9 @@ def render(navigate_to):
                 "Work Start Time",
                 min_value=6,
                 max_value=9,
-                value=9,
                 step=1,
                 format="%d AM",
+                key="theory_warmup",
                 help="What time does the marksman start work?",
             )
 
@@ -272,8 +479,6 @@ def render(navigate_to):
             else:
                 st.warning("**Current:** Starting at 9 AM - poor morning accuracy")
 
-            hangover_severity = 0.8  # Still hungover regardless
-
         elif st.session_state.active_theory == "food":
             current_theory = "food"
             st.subheader("🍳 Theory: Needs Breakfast")
@@ -283,9 +488,9 @@ def render(navigate_to):
                 "Breakfast Amount",
                 min_value=0,
                 max_value=5,
-                value=2,
                 step=1,
                 format="%d items",
+                key="theory_food",
                 help="How many breakfast items did he eat?",
             )
 
@@ -300,8 +505,6 @@ def render(navigate_to):
             else:
                 st.warning("**Current:** Normal breakfast - poor morning accuracy")
 
-            hangover_severity = 0.8  # Still hungover regardless
-
         elif st.session_state.active_theory == "fatigue":
             current_theory = "fatigue"
             st.subheader("😴 Theory: Getting Tired")
@@ -311,9 +514,9 @@ def render(navigate_to):
                 "Cups of Coffee Before Shooting in the Morning",
                 min_value=0,
                 max_value=5,
-                value=2,
                 step=1,
                 format="%d cups",
+                key="theory_fatigue",
                 help="How many cups of coffee before shooting?",
             )
 
@@ -326,8 +529,6 @@ def render(navigate_to):
                     "**Tried no coffee:** No noticable difference to several cups of coffee"
                 )
 
-            hangover_severity = 0.8  # Still hungover regardless
-
         elif st.session_state.active_theory == "hangover":
             current_theory = "hangover"
             st.subheader("🍺 Theory: Hangover Effect")
@@ -337,17 +538,14 @@ def render(navigate_to):
                 "Pints Last Night",
                 min_value=0,
                 max_value=8,
-                value=6,
                 step=1,
                 format="%d pints",
+                key="theory_hangover",
                 help="How many pints did he drink the night before?",
             )
 
             theory_value = pints_last_night
 
-            # Calculate hangover severity (0-1 scale)
-            hangover_severity = min(pints_last_night / 6.0, 1.0)
-
             if pints_last_night == 0:
                 st.success("**Result:** Both morning AND afternoon accurate! ✅")
                 st.success(
@@ -362,21 +560,33 @@ def render(navigate_to):
         if st.session_state.story_step >= 4:
             st.subheader("🎯 Target Results")
 
-            # Generate shot data based on current theory and slider value
-            morning_shots = generate_target_data(
-                "Morning", hangover_severity, current_theory, theory_value
-            )
-            afternoon_shots = generate_target_data(
-                "Afternoon", hangover_severity * 0.3, current_theory, theory_value
+            # Look up the precomputed shots for this theory and slider value
+            morning_shots, afternoon_shots, morning_score, afternoon_score = (
+                lookup_shots(current_theory, theory_value)
             )
 
             col1, col2 = st.columns([3, 2])
             with col1:
-                fig = create_target_plot(morning_shots, afternoon_shots)
-                st.plotly_chart(fig, use_container_width=True)
+                scrub_in_browser = st.toggle(
+                    "Scrub every setting in the chart",
+                    key="target_frames",
+                    help="Preview all slider settings without reloading the page",
+                )
+                if scrub_in_browser:
+                    fig = create_target_frames_plot(current_theory, theory_value)
+                    frame_chart(
+                        fig,
+                        key=f"target_frames_{current_theory}",
+                        on_change=lambda: pick_target_frame(current_theory),
+                    )
+                    st.caption(
+                        "Let go of the chart's own slider to make that setting "
+                        "your answer - the slider above follows it."
+                    )
+                else:
+                    fig = create_target_plot(morning_shots, afternoon_shots)
+                    st.plotly_chart(fig, use_container_width=True)
             with col2:
-                morning_score = calculate_accuracy_score(morning_shots)
-                afternoon_score = calculate_accuracy_score(afternoon_shots)
                 st.metric("🌅 Morning Average", f'{morning_score:.1f}" from center')
                 st.metric("🌅 Afternoon Average", f'{afternoon_score:.1f}" from center')
 
@@ -406,6 +616,49 @@ def render(navigate_to):
         )
         st.markdown("Note to self: Avoid drinking before important tasks! 🍺🚫")
 
+        with st.expander("🔬 Explore: How Many Shots Would Prove It?"):
+            st.markdown(
+                """
+            Ten shots is a small test. Each point below simulates 100,000 tests where a marksman shoots one group after drinking and one after a sober night, both in the morning. Power is the share of tests where the hungover group is clearly wider (5% one-sided test).
+            """
+            )
+
+            vary = st.radio(
+                "Make the test bigger with more...",
+                ["shots", "rifles"],
+                format_func=lambda v: (
+                    "Shots from one rifle" if v == "shots" else "Rifles"
+                ),
+                horizontal=True,
+                key="power_vary",
+            )
+            sizes, power = load_power_grid(vary)
+            st.plotly_chart(
+                create_power_plot(sizes, power, vary), use_container_width=True
+            )
+
+            pints = st.select_slider(
+                "Pints last night",
+                options=list(POWER_PINTS),
+                value=2,
+                key="power_pints",
+            )
+            column = power[:, list(POWER_PINTS).index(pints)]
+            reached = np.flatnonzero(column >= TARGET_POWER)
+            unit = "shot" if vary == "shots" else "rifle"
+            if reached.size:
+                size = sizes[reached[0]]
+                needed = f"{size} {unit}" + ("s" if size > 1 else "")
+            else:
+                needed = f"More than {sizes[-1]} {unit}s"
+            severity = theory_severity("hangover", pints)
+            widening = shot_spread(severity) / shot_spread(0) - 1
+            st.metric(f"Needed for {TARGET_POWER:.0%} power", needed)
+            st.caption(
+                f"{pints} pint{'s' if pints > 1 else ''} widens the groups by {widening:.0%}. "
+                "Small hangovers need far bigger tests to tell apart from luck."
+            )
+
     # Single Next button at the bottom
     st.divider()
 
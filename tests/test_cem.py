@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engines.cem import generate_synthetic_users, run_cem
+from pages.coarsened_exact_matching import generate_user_data, get_matching_subset
+
+
+def loop_cem_att(users):
+    """Reference CEM ATT from plain loops over user dicts"""
+
+    def bucket(user):
+        age = 0 if user["age"] < 30 else 1 if user["age"] < 50 else 2
+        income = 0 if user["income"] < 40000 else 1 if user["income"] < 80000 else 2
+        return age, income
+
+    strata = {}
+    for user in users:
+        arms = strata.setdefault(bucket(user), {"premium": [], "free": []})
+        arms[user["type"]].append(user["churned"])
+
+    effect = 0.0
+    n_matched = 0
+    for arms in strata.values():
+        if arms["premium"] and arms["free"]:
+            premium_rate = sum(arms["premium"]) / len(arms["premium"])
+            free_rate = sum(arms["free"]) / len(arms["free"])
+            effect += len(arms["premium"]) * (free_rate - premium_rate)
+            n_matched += len(arms["premium"])
+    return effect / n_matched
+
+
+def to_frame(users):
+    return pd.DataFrame(
+        {
+            "treated": [u["type"] == "premium" for u in users],
+            "age": [u["age"] for u in users],
+            "income": [u["income"] for u in users],
+            "churned": [u["churned"] for u in users],
+        }
+    )
+
+
+def synthetic_users(n_users):
+    frame = generate_synthetic_users(n_users, seed=1)
+    return [
+        {
+            "type": "premium" if treated else "free",
+            "age": age,
+            "income": income,
+            "churned": bool(churned),
+        }
+        for treated, age, income, churned in zip(
+            frame["treated"], frame["age"], frame["income"], frame["churned"]
+        )
+    ]
+
+
+@pytest.mark.parametrize(
+    "users",
+    [generate_user_data(), get_matching_subset(), synthetic_users(2_000)],
+    ids=["lesson", "matching_subset", "synthetic"],
+)
+def test_vectorised_att_matches_loop(users):
+    result = run_cem(to_frame(users))
+    assert result["cem_att"] == pytest.approx(loop_cem_att(users))
+
+    naive = np.mean([u["churned"] for u in users if u["type"] == "free"]) - np.mean(
+        [u["churned"] for u in users if u["type"] == "premium"]
+    )
+    assert result["naive_effect"] == pytest.approx(naive)
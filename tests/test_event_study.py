@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engines.event_study import EventStudy
+from engines.panel_did import Panel
+
+N_PERIODS = 12
+
+
+def make_panel(cohorts, deviation, units_per_cohort=5):
+    """Noiseless panel: unit and period effects plus deviation(event_time)
+
+    cohorts holds each treated cohort's first treated period; None adds a
+    never-treated cohort. deviation is added to every treated-cohort row.
+    """
+    rows = []
+    unit = 0
+    for cohort in cohorts:
+        for _ in range(units_per_cohort):
+            for period in range(N_PERIODS):
+                outcome = 10.0 + 0.7 * unit + 0.3 * period**1.5
+                if cohort is not None:
+                    outcome += deviation(period - cohort)
+                rows.append(
+                    (unit, period, cohort is not None and period >= cohort, outcome)
+                )
+            unit += 1
+    return Panel(pd.DataFrame(rows, columns=["unit", "period", "treated", "outcome"]))
+
+
+@pytest.mark.parametrize("control", ["never", "not_yet"])
+def test_pre_trend_comes_back_unchanged(control):
+    # One launch cohort with a linear pre-trend, then a flat effect of 2
+    study = EventStudy(make_panel([6, None], lambda e: e + 1.0 if e < 0 else 2.0))
+    effects = study.event_time_effects(control=control)["att"]
+
+    leads = effects[effects.index < -1]
+    np.testing.assert_allclose(leads, leads.index + 1.0)
+    np.testing.assert_allclose(effects[effects.index >= 0], 2.0)
+
+
+@pytest.mark.parametrize("control", ["never", "not_yet"])
+def test_staggered_growing_effects(control):
+    study = EventStudy(
+        make_panel([4, 6, 8, None], lambda e: 1.0 + 0.5 * e if e >= 0 else 0.0)
+    )
+    effects = study.cohort_time_effects(control)
+
+    leads = effects[effects["event_time"] < 0]
+    lags = effects[effects["event_time"] >= 0]
+    np.testing.assert_allclose(leads["att"], 0.0, atol=1e-9)
+    np.testing.assert_allclose(lags["att"], 1.0 + 0.5 * lags["event_time"])
@@ -0,0 +1,43 @@
+import pytest
+
+from benchmarks.bench_hover_payload import (
+    legacy_comparison_plot,
+    legacy_scatter_plot,
+    measure,
+)
+from pages.confounders import (
+    create_instrumental_comparison_plot,
+    create_scatter_plot,
+    generate_classroom_data,
+    generate_treated_data,
+)
+
+N_STUDENTS = 100_000
+
+
+@pytest.fixture(scope="module")
+def classes():
+    return generate_classroom_data(N_STUDENTS), generate_treated_data(N_STUDENTS)
+
+
+def test_scatter_hovers_use_a_template(classes):
+    original, _ = classes
+    before = measure(lambda: legacy_scatter_plot(original), repeat=1)
+    after = measure(lambda: create_scatter_plot(original, show_confounders=True), 1)
+
+    assert all(trace.text is None for trace in create_scatter_plot(original).data)
+    assert after[1] < before[1] / 2
+    assert after[0] < before[0]
+
+
+def test_comparison_hovers_use_a_template(classes):
+    original, treated = classes
+    before = measure(lambda: legacy_comparison_plot(original, treated), repeat=1)
+    after = measure(
+        lambda: create_instrumental_comparison_plot(original, treated), repeat=1
+    )
+
+    fig = create_instrumental_comparison_plot(original, treated)
+    assert all(trace.text is None for trace in fig.data)
+    assert after[1] < before[1] / 2
+    assert after[0] < before[0]
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+from engines.iv import ordinary_least_squares, two_stage_least_squares
+from pages.confounders import generate_classroom_data, generate_treated_data
+
+# Just-identified example small enough to check by hand
+FRAME = pd.DataFrame(
+    {
+        "y": [3.0, 5.0, 4.0, 8.0, 9.0, 7.0],
+        "x": [1.0, 2.0, 2.0, 4.0, 5.0, 3.0],
+        "z": [0.0, 1.0, 0.0, 1.0, 1.0, 0.0],
+    }
+)
+
+
+def test_just_identified_2sls_matches_hand_computation():
+    y, x, z = (FRAME[name].to_numpy() for name in ("y", "x", "z"))
+    n = len(FRAME)
+
+    # IV slope: cov(z, y) / cov(z, x); the intercept passes through the means
+    slope = ((z - z.mean()) @ (y - y.mean())) / ((z - z.mean()) @ (x - x.mean()))
+    intercept = y.mean() - slope * x.mean()
+
+    # HC1 sandwich (Z'X)^-1 Z' diag(u^2) Z (X'Z)^-1 * n / (n - k)
+    design = np.column_stack([np.ones(n), x])
+    instruments = np.column_stack([np.ones(n), z])
+    resid = y - design @ [intercept, slope]
+    bread = np.linalg.inv(instruments.T @ design)
+    meat = (instruments * resid[:, None] ** 2).T @ instruments
+    cov = bread @ meat @ bread.T * n / (n - 2)
+
+    result = two_stage_least_squares(FRAME, "y", ["x"], instruments=["z"])
+    params = result["params"]
+    np.testing.assert_allclose(params["coef"], [intercept, slope])
+    np.testing.assert_allclose(params["std_err"], np.sqrt(np.diag(cov)))
+
+
+def test_first_stage_f_is_squared_classical_t_of_the_instrument():
+    result = two_stage_least_squares(FRAME, "y", ["x"], instruments=["z"])
+    # One excluded instrument: F equals the squared classical t of its OLS slope
+    classical = two_stage_least_squares(
+        FRAME, "x", ["z"], instruments=(), cov_type="nonrobust"
+    )
+    np.testing.assert_allclose(
+        result["first_stage"].loc["x", "f_stat"],
+        classical["params"].loc["z", "t_stat"] ** 2,
+    )
+
+
+def reference_2sls(y, x, z):
+    """Two explicit lstsq stages plus an HC1 sandwich, for a constant plus x"""
+    n = len(y)
+    design = np.column_stack([np.ones(n), x])
+    instruments = np.column_stack([np.ones(n), z])
+
+    fitted = instruments @ np.linalg.lstsq(instruments, design, rcond=None)[0]
+    params = np.linalg.lstsq(fitted, y, rcond=None)[0]
+    resid = y - design @ params
+
+    bread = np.linalg.inv(fitted.T @ fitted)
+    meat = fitted.T @ (fitted * resid[:, None] ** 2)
+    cov = bread @ meat @ bread * n / (n - 2)
+
+    # First-stage F: x on the constant alone vs on the constant and z
+    rss_full = np.sum((x - fitted[:, 1]) ** 2)
+    rss_const = np.sum((x - x.mean()) ** 2)
+    f_stat = (rss_const - rss_full) / (rss_full / (n - 2))
+    return params, np.sqrt(np.diag(cov)), f_stat
+
+
+def test_2sls_matches_reference_on_the_lesson_sample():
+    treated = generate_treated_data(500)
+    y, x, z = (
+        treated[name].to_numpy()
+        for name in ("grades", "classroom_hours", "forced_extra_hours")
+    )
+    params, std_err, f_stat = reference_2sls(y, x, z)
+
+    result = two_stage_least_squares(
+        treated, "grades", ["classroom_hours"], instruments=["forced_extra_hours"]
+    )
+    np.testing.assert_allclose(result["params"]["coef"], params, rtol=1e-10)
+    np.testing.assert_allclose(result["params"]["std_err"], std_err, rtol=1e-10)
+    np.testing.assert_allclose(
+        result["first_stage"].loc["classroom_hours", "f_stat"], f_stat, rtol=1e-10
+    )
+
+
+def test_ols_matches_reference_on_the_lesson_sample():
+    original = generate_classroom_data(500)
+    y, x = original["grades"].to_numpy(), original["classroom_hours"].to_numpy()
+
+    # With x as its own instrument the reference reduces to OLS
+    params, std_err, _ = reference_2sls(y, x, x)
+
+    result = ordinary_least_squares(original, "grades", ["classroom_hours"])
+    np.testing.assert_allclose(result["params"]["coef"], params, rtol=1e-10)
+    np.testing.assert_allclose(result["params"]["std_err"], std_err, rtol=1e-10)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from engines.shot_power import (
+    hangover_power,
+    required_sample_size,
+    simulate_design,
+    spread_statistic,
+)
+
+N_TESTS = 20_000
+
+
+def test_critical_value_holds_alpha_on_independent_draws():
+    # Calibrate on one seed, then count false alarms on fresh sober pairs
+    critical = np.quantile(
+        spread_statistic(*simulate_design(10, n_tests=N_TESTS, seed=1)), 0.95
+    )
+    fresh = spread_statistic(*simulate_design(10, n_tests=N_TESTS, seed=2))
+    assert np.mean(fresh > critical) == pytest.approx(0.05, abs=0.006)
+
+
+@pytest.mark.parametrize("vary", ["shots", "rifles"])
+def test_power_grows_with_the_design(vary):
+    sizes = [2, 4, 8, 16]
+    power = [
+        hangover_power(
+            [0.3],
+            n_shots=size if vary == "shots" else 4,
+            n_rifles=1 if vary == "shots" else size,
+            n_tests=N_TESTS,
+        )[0]
+        for size in sizes
+    ]
+    assert np.all(np.diff(power) > 0)
+
+
+@pytest.mark.parametrize("vary", ["shots", "rifles"])
+def test_required_sample_size_matches_a_scan(vary):
+    def power_at(size):
+        shots, rifles = (size, 1) if vary == "shots" else (10, size)
+        return hangover_power([0.3], shots, rifles, n_tests=N_TESTS)[0]
+
+    scanned = next(size for size in range(1, 65) if power_at(size) >= 0.8)
+    assert required_sample_size(0.3, vary=vary, n_tests=N_TESTS) == scanned
+
+
+def test_statistic_does_not_depend_on_the_sober_spread():
+    hungover, sober = simulate_design(10, n_tests=1_000, seed=3)
+    for spread in (0.5, 2.2, 10.0):
+        np.testing.assert_allclose(
+            spread_statistic(spread * hungover, spread * sober),
+            spread_statistic(hungover, sober),
+        )
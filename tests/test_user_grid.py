@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+ROOT = str(Path(__file__).resolve().parents[1])
+
+GRID_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+
+from benchmarks.bench_session_state import synthetic_user_dicts
+from components.user_grid import grid_payload, user_grid
+from engines.user_store import build_user_store
+
+payload = grid_payload(build_user_store(synthetic_user_dicts({n_users})))
+user_grid(payload, selectable=False, key="preview")
+user_grid(payload, matched_rows=[0, 1], key="matching")
+"""
+
+PAGE_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+
+from pages.coarsened_exact_matching import render
+
+render(lambda page: None)
+"""
+
+
+def element_types(node):
+    """Types of every element the script emitted, block by block"""
+    children = getattr(node, "children", None)
+    if children is None:
+        return [node.type]
+    return [kind for child in children.values() for kind in element_types(child)]
+
+
+def run(script, **session_state):
+    at = AppTest.from_string(script, default_timeout=120)
+    for name, value in session_state.items():
+        at.session_state[name] = value
+    at.run()
+    assert not at.exception
+    return at
+
+
+@pytest.mark.parametrize("n_users", [50, 5_000])
+def test_grid_is_one_element_whatever_the_population(n_users):
+    at = run(GRID_SCRIPT.format(root=ROOT, n_users=n_users))
+
+    assert element_types(at._tree) == ["component_instance"] * 2
+
+
+@pytest.mark.parametrize("step", [5, 9, 11])
+def test_lesson_emits_no_widget_per_user(step):
+    at = run(
+        PAGE_SCRIPT.format(root=ROOT),
+        lesson6_step=step,
+        show_naive=True,
+        show_matching=True,
+        show_buckets=True,
+        use_subset=step >= 9,
+    )
+
+    grids = 1 if step < 9 else 2
+    assert element_types(at._tree).count("component_instance") == grids
+    assert not [button for button in at.button if "🚶" in button.label]
+    assert not [button for button in at.button if button.key]